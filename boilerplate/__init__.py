@@ -1,3 +1,5 @@
 # -*- coding: utf-8 -*-
 
 __version__ = '0.9.4'
+
+default_app_config = 'boilerplate.apps.BoilerplateConfig'
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+from django.apps import AppConfig
+
+
+class BoilerplateConfig(AppConfig):
+    name = 'boilerplate'
+    verbose_name = 'Boilerplate'
+
+    def ready(self):
+        from .utils import build_relation_graph
+
+        build_relation_graph()
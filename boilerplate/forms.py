@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+from django import forms
+from django.utils.translation import ugettext_lazy as _
+
+
+class ImportForm(forms.Form):
+    """
+    Upload form of :class:`~boilerplate.mixins.ImportMixin`.
+    """
+    file = forms.FileField(
+        label=_('File'),
+        help_text=_('A CSV file with a header line of field names.'),
+    )
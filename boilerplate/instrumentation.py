@@ -0,0 +1,466 @@
+# -*- coding: utf-8 -*-
+import logging
+import math
+import os
+import socket
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import wraps
+from timeit import default_timer
+
+from django.core.cache import caches
+from django.db import connections
+
+from .boilerplate import get_boilerplate_setting
+
+logger = logging.getLogger('boilerplate.queries')
+
+_local = threading.local()
+
+
+def get_current_record():
+    """
+    Return the :class:`QueryRecord` of the current thread or ``None``.
+    """
+    return getattr(_local, 'record', None)
+
+
+def instrumented(func):
+    """
+    Attribute the queries executed by ``func`` to its name while a
+    :class:`QueryRecord` is active. It only checks a thread local when
+    nothing is recorded.
+
+    **Example**
+    ::
+        class ParentMixin(object):
+            @instrumented
+            def get_parent(self):
+                ...
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        record = getattr(_local, 'record', None)
+
+        if record is None:
+            return func(*args, **kwargs)
+
+        record.stack.append(name)
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record.stack.pop()
+
+    return wrapper
+
+
+class QueryRecord(object):
+    """
+    Count the queries and the SQL time of every database connection while
+    it is active, grouped by the innermost :func:`instrumented` function
+    that executed them, or ``default_section``.
+
+    **Example**
+    ::
+        with QueryRecord('ActorList') as record:
+            ...
+
+        record.count, record.time, record.sections
+    """
+
+    def __init__(self, name, default_section='view', budget=None):
+        self.name = name
+        self.default_section = default_section
+        self.budget = budget
+        self.stack = list()
+        self.count = 0
+        self.time = 0.0
+        self.sections = OrderedDict()
+        self._connections = list()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = default_timer()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(
+                self.stack[-1] if self.stack else self.default_section,
+                default_timer() - start
+            )
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'record', None)
+        _local.record = self
+
+        for connection in connections.all():
+            if hasattr(connection, 'execute_wrappers'):
+                connection.execute_wrappers.append(self)
+                self._connections.append(connection)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for connection in self._connections:
+            connection.execute_wrappers.remove(self)
+
+        self._connections = list()
+        _local.record = self._previous
+
+    def add(self, section, duration):
+        count, time = self.sections.get(section, (0, 0.0))
+        self.sections[section] = (count + 1, time + duration)
+        self.count += 1
+        self.time += duration
+
+    def get_budget(self):
+        """
+        Return the budget as a dictionary of section and maximum number of
+        queries, the key ``'total'`` limits all the queries.
+        """
+        if self.budget is None:
+            return dict()
+
+        if isinstance(self.budget, dict):
+            return self.budget
+
+        return {'total': self.budget}
+
+    def get_exceeded(self, budget=None):
+        """
+        Return the list of ``(section, count, maximum)`` over the budget.
+        """
+        if budget is None:
+            budget = self.get_budget()
+        elif not isinstance(budget, dict):
+            budget = {'total': budget}
+
+        exceeded = list()
+
+        for section, maximum in sorted(budget.items()):
+            if section == 'total':
+                count = self.count
+            else:
+                count = self.sections.get(section, (0, 0.0))[0]
+
+            if count > maximum:
+                exceeded.append((section, count, maximum))
+
+        return exceeded
+
+    def as_dict(self):
+        return {
+            'view': self.name,
+            'queries': self.count,
+            'sql_time': round(self.time * 1000, 3),
+            'sections': OrderedDict(
+                (section, {
+                    'queries': count,
+                    'sql_time': round(time * 1000, 3),
+                })
+                for section, (count, time) in self.sections.items()
+            ),
+        }
+
+    def log(self, **extra):
+        """
+        Log the record to ``boilerplate.queries``, the fields of
+        :meth:`as_dict` and ``extra`` are attributes of the log record. It is
+        a warning when the budget is exceeded.
+        """
+        data = self.as_dict()
+        data.update(extra)
+
+        logger.log(
+            logging.WARNING if self.get_exceeded() else logging.INFO,
+            '%s: %s queries in %.3f ms', self.name, self.count,
+            self.time * 1000, extra=data
+        )
+
+    def get_server_timing(self):
+        """
+        Return the value of the ``Server-Timing`` header, the total SQL time
+        as ``db`` and then each section, durations in milliseconds.
+        """
+        metrics = ['db;dur=%.3f;desc="%s queries"' % (
+            self.time * 1000, self.count
+        )]
+
+        for section, (count, time) in self.sections.items():
+            metrics.append('%s;dur=%.3f;desc="%s queries"' % (
+                section, time * 1000, count
+            ))
+
+        return ', '.join(metrics)
+
+
+def wrap_render(response, wrapper):
+    """
+    Make the deferred render of a template response call
+    ``wrapper(render)``, so a view measures the render where Django runs
+    it, after the ``process_template_response`` of the middlewares. Return
+    ``False`` when ``response`` is not a template response to render.
+    """
+    if (
+        not callable(getattr(response, 'render', None)) or
+        getattr(response, 'is_rendered', True)
+    ):
+        return False
+
+    def render():
+        # Back to the render of the class, it can be pickled once rendered
+        del response.render
+
+        return wrapper(response.render)
+
+    response.render = render
+
+    return True
+
+
+def assert_query_budget(response, budget=None):
+    """
+    Test helper that fails when the view of ``response`` executed more
+    queries than ``budget``, by default the ``query_budget`` of the view.
+
+    **Example**
+    ::
+        response = self.client.get('/actors/')
+        assert_query_budget(response, {'total': 3, 'get_parent': 1})
+    """
+    record = getattr(response, 'query_record', None)
+
+    if record is None:
+        raise AssertionError(
+            'The response has no query record, is the view using '
+            'QueryInstrumentationMixin?'
+        )
+
+    exceeded = record.get_exceeded(budget)
+
+    if exceeded:
+        raise AssertionError('%s exceeded its query budget: %s' % (
+            record.name, ', '.join(
+                '%s %s > %s' % (section, count, maximum)
+                for section, count, maximum in exceeded
+            )
+        ))
+
+
+def percentile(values, percent):
+    """
+    Return the nearest-rank ``percent`` percentile of the sorted ``values``.
+    """
+    if not values:
+        return None
+
+    index = int(math.ceil(percent / 100.0 * len(values))) - 1
+
+    return values[max(0, index)]
+
+
+class StageProfiler(object):
+    """
+    Record the wall time of the :func:`profiled` stages, like
+    ``SendEmail.send`` or ``ModelImageThumbs.save``. It keeps the last
+    ``max_samples`` durations of each stage in the process to compute the
+    p50 and p95, and every ``publish_interval`` seconds publishes them to
+    the cache so the ``profile_stages`` command can merge all the processes,
+    which requires a cache shared by them.
+
+    It is enabled with the ``profile_stages`` boilerplate setting, disabled a
+    stage only checks ``enabled``.
+
+    **Example**
+    ::
+        BOILERPLATE = {
+            'profile_stages': True,
+        }
+    """
+    index_key = 'boilerplate.profile.processes'
+
+    def __init__(self, enabled=False, max_samples=1000, publish_interval=10,
+                 cache_alias='default', cache_timeout=3600):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self.publish_interval = publish_interval
+        self.cache_alias = cache_alias
+        self.cache_timeout = cache_timeout
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = dict()
+            self.counts = dict()
+            self.published = default_timer()
+
+    def record(self, stage, duration):
+        with self.lock:
+            if stage not in self.samples:
+                self.samples[stage] = deque(maxlen=self.max_samples)
+                self.counts[stage] = 0
+
+            self.samples[stage].append(duration)
+            self.counts[stage] += 1
+            publish = (
+                self.publish_interval is not None and
+                default_timer() - self.published >= self.publish_interval
+            )
+
+        stages = getattr(_local, 'stages', None)
+
+        if stages is not None:
+            stages.append((stage, duration))
+
+        if publish:
+            self.publish()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Record the wall time of a block as the stage ``name``.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start = default_timer()
+
+        try:
+            yield
+        finally:
+            self.record(name, default_timer() - start)
+
+    def start_request(self):
+        _local.stages = list()
+
+    def end_request(self):
+        """
+        Return the ``(stage, duration)`` recorded since
+        :meth:`start_request` in this thread.
+        """
+        stages = getattr(_local, 'stages', None) or list()
+        _local.stages = None
+
+        return stages
+
+    def get_data(self):
+        with self.lock:
+            return {
+                'samples': dict(
+                    (stage, list(samples))
+                    for stage, samples in self.samples.items()
+                ),
+                'counts': dict(self.counts),
+            }
+
+    def get_stats(self, data=None):
+        """
+        Return the number of calls and the p50, p95 and maximum durations of
+        each stage, in milliseconds.
+        """
+        if data is None:
+            data = self.get_data()
+
+        stats = OrderedDict()
+
+        for stage in sorted(data['samples']):
+            samples = sorted(data['samples'][stage])
+            stats[stage] = {
+                'count': data['counts'].get(stage, len(samples)),
+                'p50': percentile(samples, 50) * 1000,
+                'p95': percentile(samples, 95) * 1000,
+                'max': samples[-1] * 1000,
+            }
+
+        return stats
+
+    def get_cache_key(self):
+        return 'boilerplate.profile.%s.%s' % (
+            socket.gethostname(), os.getpid()
+        )
+
+    def publish(self):
+        """
+        Publish the samples of this process to the cache.
+        """
+        cache = caches[self.cache_alias]
+        key = self.get_cache_key()
+        self.published = default_timer()
+        cache.set(key, self.get_data(), self.cache_timeout)
+        keys = cache.get(self.index_key) or list()
+
+        if key not in keys:
+            keys.append(key)
+
+        cache.set(self.index_key, keys, self.cache_timeout)
+
+    def collect(self):
+        """
+        Return the samples published by all the processes, merged.
+        """
+        cache = caches[self.cache_alias]
+        data = {'samples': dict(), 'counts': dict()}
+        keys = cache.get(self.index_key) or list()
+
+        for published in cache.get_many(keys).values():
+            for stage, samples in published['samples'].items():
+                data['samples'].setdefault(stage, list()).extend(samples)
+                data['counts'][stage] = (
+                    data['counts'].get(stage, 0) +
+                    published['counts'].get(stage, len(samples))
+                )
+
+        return data
+
+    def clear(self):
+        """
+        Remove the published samples of all the processes.
+        """
+        cache = caches[self.cache_alias]
+        cache.delete_many(
+            (cache.get(self.index_key) or list()) + [self.index_key]
+        )
+
+
+profiler = StageProfiler(
+    enabled=get_boilerplate_setting('profile_stages', False),
+    max_samples=get_boilerplate_setting('profile_max_samples', 1000),
+    publish_interval=get_boilerplate_setting('profile_publish_interval', 10),
+    cache_alias=get_boilerplate_setting('profile_cache_alias', 'default'),
+)
+
+
+def profiled(name):
+    """
+    Record the wall time of the decorated function as the stage ``name``
+    of the :class:`StageProfiler`.
+
+    **Example**
+    ::
+        class SendEmail(object):
+            @profiled('SendEmail.send')
+            def send(self, fail_silently=True, test=False):
+                ...
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+
+            start = default_timer()
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(name, default_timer() - start)
+
+        return wrapper
+
+    return decorator
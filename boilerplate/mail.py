@@ -7,6 +7,8 @@ from django.template.loader import get_template
 from django.utils.text import slugify
 from django.utils import translation
 
+from .instrumentation import profiled, profiler
+
 
 class SendEmail(object):
     """
@@ -184,6 +186,7 @@ class SendEmail(object):
 
         return self.context_data
 
+    @profiled('SendEmail.send')
     def send(self, fail_silently=True, test=False):
         template_name = self.get_template_name()
         content = self.get_content()
@@ -197,12 +200,15 @@ class SendEmail(object):
             translation.activate(self.language)
 
         if template_name:
-            plain_template = get_template(template_name + '.txt')
-            plain_content = plain_template.render(self.get_context_data())
-
-            if self.is_html:
-                html_template = get_template(template_name + '.html')
-                html_content = html_template.render(self.get_context_data())
+            with profiler.stage('SendEmail.render'):
+                plain_template = get_template(template_name + '.txt')
+                plain_content = plain_template.render(self.get_context_data())
+
+                if self.is_html:
+                    html_template = get_template(template_name + '.html')
+                    html_content = html_template.render(
+                        self.get_context_data()
+                    )
         elif content:
             plain_content = content
 
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from ...models import DeletionTask
+
+
+class Command(BaseCommand):
+    """
+    Delete the objects scheduled with
+    :meth:`~boilerplate.models.DeletionTask.schedule`, in batches.
+
+    **Example**
+    ::
+        python manage.py process_deletions --batch-size 500
+    """
+    help = 'Delete the objects scheduled for deletion, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Maximum number of rows deleted per query.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Maximum number of tasks to process.'
+        )
+
+    def handle(self, *args, **options):
+        tasks = DeletionTask.objects.filter(
+            status__in=(
+                DeletionTask.STATUS_PENDING, DeletionTask.STATUS_RUNNING
+            )
+        )
+
+        if options['limit']:
+            tasks = tasks[:options['limit']]
+
+        for task in tasks:
+            try:
+                task.run(batch_size=options['batch_size'])
+            except Exception as e:
+                self.stderr.write(
+                    'Failed to delete %s: %s' % (task.object_repr, e)
+                )
+            else:
+                self.stdout.write(
+                    'Deleted %s: %s rows' % (task.object_repr, task.deleted)
+                )
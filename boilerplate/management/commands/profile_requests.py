@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import datetime
+import os
+import pstats
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from django.core.management.base import BaseCommand
+
+from ...profiling import (
+    clean_dump_name, get_dumps, get_profile_token, parse_dump_filename
+)
+
+
+class Command(BaseCommand):
+    """
+    List the ``.pstats`` dumps of the profiled requests and summarize the
+    hottest functions across them, see
+    :class:`~boilerplate.middleware.CProfileMiddleware`.
+
+    **Example**
+    ::
+        python manage.py profile_requests --list
+        python manage.py profile_requests --view ActorList --sort tottime
+        python manage.py profile_requests --token
+    """
+    help = 'Summarize the hottest functions of the profiled requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--list', action='store_true', default=False,
+            help='List the dumps instead of summarizing them.'
+        )
+        parser.add_argument(
+            '--view', default=None,
+            help='Only the dumps of this view class.'
+        )
+        parser.add_argument(
+            '--url-name', default=None,
+            help='Only the dumps of this URL name.'
+        )
+        parser.add_argument(
+            '--sort', default='cumulative',
+            help='pstats sort key, e.g. cumulative, tottime, calls.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Number of functions to show.'
+        )
+        parser.add_argument(
+            '--token', action='store_true', default=False,
+            help='Print a signed value for the profile header.'
+        )
+        parser.add_argument(
+            '--clear', action='store_true', default=False,
+            help='Remove the dumps.'
+        )
+
+    def get_dumps(self, options):
+        dumps = list()
+
+        for path in get_dumps():
+            timestamp, url_name, view_name = parse_dump_filename(path)
+
+            if options['view'] and view_name != options['view']:
+                continue
+
+            if (
+                options['url_name'] and
+                url_name != clean_dump_name(options['url_name'])
+            ):
+                continue
+
+            dumps.append((path, timestamp, url_name, view_name))
+
+        return dumps
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(get_profile_token())
+            return
+
+        dumps = self.get_dumps(options)
+
+        if options['clear']:
+            for path, timestamp, url_name, view_name in dumps:
+                os.remove(path)
+
+            self.stdout.write('Removed %s dumps.' % len(dumps))
+            return
+
+        if not dumps:
+            self.stdout.write('No dumps.')
+            return
+
+        if options['list']:
+            for path, timestamp, url_name, view_name in dumps:
+                self.stdout.write('%s  %s  %s  %s' % (
+                    datetime.datetime.fromtimestamp(timestamp).strftime(
+                        '%Y-%m-%d %H:%M:%S'
+                    ),
+                    url_name, view_name, os.path.basename(path)
+                ))
+            return
+
+        stream = StringIO()
+        stats = pstats.Stats(
+            *[path for path, timestamp, url_name, view_name in dumps],
+            stream=stream
+        )
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write('%s requests' % len(dumps))
+        self.stdout.write(stream.getvalue())
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from ...instrumentation import profiler
+
+
+class Command(BaseCommand):
+    """
+    Show the p50 and p95 wall time of the profiled stages published by all
+    the processes, see :class:`~boilerplate.instrumentation.StageProfiler`.
+
+    **Example**
+    ::
+        python manage.py profile_stages
+        python manage.py profile_stages --reset
+    """
+    help = 'Show the p50 and p95 wall time of the profiled stages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true', default=False,
+            help='Remove the published samples.'
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            profiler.clear()
+            self.stdout.write('Removed the published samples.')
+            return
+
+        stats = profiler.get_stats(profiler.collect())
+
+        if not stats:
+            self.stdout.write(
+                'No samples, is the profile_stages setting enabled?'
+            )
+            return
+
+        width = max(len(stage) for stage in stats)
+        self.stdout.write('%s %10s %10s %10s %10s' % (
+            'Stage'.ljust(width), 'Calls', 'p50 ms', 'p95 ms', 'Max ms'
+        ))
+
+        for stage, data in stats.items():
+            self.stdout.write('%s %10d %10.3f %10.3f %10.3f' % (
+                stage.ljust(width), data['count'], data['p50'], data['p95'],
+                data['max']
+            ))
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import cProfile
+from collections import OrderedDict
+
+try:
+    from django.utils.deprecation import MiddlewareMixin
+except ImportError:
+    MiddlewareMixin = object
+
+from .instrumentation import profiler
+from .profiling import get_view_name, save_profile, should_profile
+
+
+class StageProfileMiddleware(MiddlewareMixin):
+    """
+    Add the wall time of the profiled stages of each request to the
+    ``Server-Timing`` header, see
+    :class:`~boilerplate.instrumentation.StageProfiler`. It does nothing
+    unless the ``profile_stages`` setting is enabled.
+
+    **Example**
+    ::
+        MIDDLEWARE = [
+            ...
+            'boilerplate.middleware.StageProfileMiddleware',
+        ]
+    """
+
+    def process_request(self, request):
+        if profiler.enabled:
+            profiler.start_request()
+
+    def process_response(self, request, response):
+        if not profiler.enabled:
+            return response
+
+        stages = OrderedDict()
+
+        for stage, duration in profiler.end_request():
+            count, total = stages.get(stage, (0, 0.0))
+            stages[stage] = (count + 1, total + duration)
+
+        if stages:
+            metrics = [
+                '%s;dur=%.3f;desc="%s calls"' % (stage, total * 1000, count)
+                for stage, (count, total) in stages.items()
+            ]
+
+            if response.has_header('Server-Timing'):
+                metrics.insert(0, response['Server-Timing'])
+
+            response['Server-Timing'] = ', '.join(metrics)
+
+        return response
+
+
+class CProfileMiddleware(MiddlewareMixin):
+    """
+    Profile a sample of the requests, ``profile_sample_rate``, or the
+    requests with a signed profile header under ``cProfile`` and save the
+    ``.pstats`` dump, see :mod:`boilerplate.profiling`. Summarize the dumps
+    with the ``profile_requests`` command.
+
+    The profiler is enabled around the rest of the request, so the view is
+    still called by Django with the ``process_view`` of the next middlewares,
+    ``ATOMIC_REQUESTS`` and the exception handling.
+
+    **Example**
+    ::
+        MIDDLEWARE = [
+            'boilerplate.middleware.CProfileMiddleware',
+            ...
+        ]
+
+        BOILERPLATE = {
+            'profile_sample_rate': 0.001,
+        }
+    """
+
+    def process_request(self, request):
+        if not should_profile(request):
+            return
+
+        request._boilerplate_profiled = True
+        request._boilerplate_profile = cProfile.Profile()
+        request._boilerplate_profile.enable()
+
+    def process_response(self, request, response):
+        profile = getattr(request, '_boilerplate_profile', None)
+
+        if profile is None:
+            return response
+
+        profile.disable()
+        request._boilerplate_profile = None
+        resolver_match = getattr(request, 'resolver_match', None)
+        response.profile_path = save_profile(
+            profile, getattr(resolver_match, 'view_name', None),
+            get_view_name(resolver_match.func) if resolver_match else '-'
+        )
+
+        return response
@@ -1,17 +1,51 @@
 # -*- coding: utf-8 -*-
-from django.core.exceptions import PermissionDenied
+import codecs
+import csv
+import datetime
+import hashlib
+from calendar import timegm
+
+from django.core.cache import caches
+from django.core.exceptions import (
+    NON_FIELD_ERRORS, FieldDoesNotExist, PermissionDenied, ValidationError
+)
+from django.core.paginator import InvalidPage, Paginator
 from django.contrib import messages
 from django.contrib.admin.utils import model_ngettext
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, Max
+from django.forms.utils import ErrorDict
+from django.http import (
+    Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404
-from .utils import get_deleted_objects
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+from .forms import ImportForm
+from .instrumentation import (
+    QueryRecord, instrumented, profiled, wrap_render
+)
+from .pagination import (
+    EstimatedCountPaginator, HasNextPaginator, KeysetPaginator
+)
+from .profiling import get_view_name, profile_view, should_profile
+from .utils import (
+    PrefetchRecorder, bulk_save_formset, cache_batch_choices,
+    cache_model_choices, fast_delete_objects, get_deleted_objects,
+    get_deleted_objects_summary, iterate_values, stream_csv,
+    stream_json_lines
+)
 
 try:
     from django.urls import reverse_lazy
 except ImportError:
     from django.core.urlresolvers import reverse_lazy
+from django.utils.encoding import force_bytes, force_text
 from django.utils.translation import ugettext_lazy as _
 
+import six
+
 
 class NoLoginRequiredMixin(object):
     """
@@ -71,6 +105,605 @@ class ActionListMixin(object):
         return super(ActionListMixin, self).get_context_data(**kwargs)
 
 
+class KeysetPaginationMixin(object):
+    """
+    Mixin for :class:`~django.views.generic.list.ListView` classes that
+    paginates with cursors instead of page numbers, see
+    :class:`~boilerplate.pagination.KeysetPaginator`. Deep pages cost the
+    same as the first one since there is no ``OFFSET`` nor ``COUNT(*)``.
+
+    The ordering is taken from ``get_ordering()`` or the model
+    ``Meta.ordering``. Use the ``cursor_replace`` template tag to build the
+    links to the next and previous pages.
+
+    **Example**
+    ::
+        class ActorList(KeysetPaginationMixin, ListView):
+            model = Actor
+            paginate_by = 30
+    """
+    cursor_param = 'cursor'
+    keyset_paginator_class = KeysetPaginator
+
+    def get_cursor_param(self):
+        return self.cursor_param
+
+    def get_keyset_ordering(self, queryset):
+        """
+        Return the ordering used to build the cursors, ``None`` to use the
+        ordering of the queryset.
+        """
+        ordering = self.get_ordering()
+
+        if isinstance(ordering, six.string_types):
+            return (ordering, )
+
+        return ordering
+
+    def get_keyset_paginator(self, queryset, per_page):
+        return self.keyset_paginator_class(
+            queryset,
+            per_page,
+            ordering=self.get_keyset_ordering(queryset),
+            cursor_param=self.get_cursor_param(),
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_keyset_paginator(queryset, page_size)
+        cursor = self.request.GET.get(paginator.cursor_param)
+
+        try:
+            page = paginator.page(cursor)
+        except InvalidPage as e:
+            raise Http404(_('Invalid page: %(message)s') % {
+                'message': str(e)
+            })
+
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class PaginateCountMixin(object):
+    """
+    Mixin for :class:`~django.views.generic.list.ListView` classes to choose
+    how the paginator counts the rows with ``paginate_count``:
+
+    * ``'exact'``: the default ``COUNT(*)`` of Django.
+    * ``'estimate'``: the planner estimate above
+      ``paginate_estimate_threshold`` rows, see
+      :class:`~boilerplate.pagination.EstimatedCountPaginator`.
+    * ``'none'``: no count, only previous and next pages, see
+      :class:`~boilerplate.pagination.HasNextPaginator`.
+
+    **Example**
+    ::
+        class ActorList(PaginateCountMixin, ListView):
+            model = Actor
+            paginate_by = 30
+            paginate_count = 'none'
+    """
+    paginate_count = 'estimate'
+    paginate_estimate_threshold = None
+    paginate_count_timeout = None
+
+    def get_paginate_count(self):
+        return self.paginate_count
+
+    def get_paginator(self, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True, **kwargs):
+        paginate_count = self.get_paginate_count()
+
+        if paginate_count == 'estimate':
+            kwargs.setdefault(
+                'estimate_threshold', self.paginate_estimate_threshold
+            )
+            kwargs.setdefault(
+                'count_cache_timeout', self.paginate_count_timeout
+            )
+
+            return EstimatedCountPaginator(
+                queryset, per_page, orphans=orphans,
+                allow_empty_first_page=allow_empty_first_page, **kwargs
+            )
+
+        if paginate_count == 'none':
+            return HasNextPaginator(
+                queryset, per_page, orphans=orphans,
+                allow_empty_first_page=allow_empty_first_page, **kwargs
+            )
+
+        return super(PaginateCountMixin, self).get_paginator(
+            queryset, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page, **kwargs
+        )
+
+
+class ExportMixin(object):
+    """
+    Mixin for :class:`~django.views.generic.list.ListView` classes that
+    streams the list as CSV or JSON Lines when the ``export`` parameter is
+    ``csv`` or ``jsonl``, or always when ``export_format`` is set.
+
+    The rows come from ``get_queryset()``, so the export keeps the filters
+    and the ordering of the list, and they are fetched ``export_chunk_size``
+    at a time with ``values_list()`` and sent while they are read, in
+    constant memory.
+
+    The CSV values that start with ``=``, ``+``, ``-`` or ``@`` are prefixed
+    with ``'`` so spreadsheets don't run them as formulas, set
+    ``export_escape_formulas`` to ``False`` to write them unchanged.
+
+    **Example**
+    ::
+        class ActorList(ExportMixin, ListView):
+            export_fields = ('last_name', 'first_name', 'birth_date')
+            model = Actor
+    """
+    export_param = 'export'
+    export_format = None
+    export_fields = None
+    export_chunk_size = 2000
+    export_filename = None
+    export_escape_formulas = True
+    export_content_types = {
+        'csv': 'text/csv',
+        'jsonl': 'application/x-ndjson',
+    }
+
+    def get_export_format(self):
+        """
+        Return the requested export format or ``None`` to show the list.
+        """
+        export_format = (
+            self.export_format or self.request.GET.get(self.export_param)
+        )
+
+        if export_format in self.export_content_types:
+            return export_format
+
+        return None
+
+    def get_export_queryset(self):
+        return self.get_queryset()
+
+    def get_export_fields(self, queryset):
+        """
+        Return the field names or lookups to export, by default all the
+        concrete fields of the model.
+        """
+        if self.export_fields:
+            return list(self.export_fields)
+
+        return [
+            field.attname for field in queryset.model._meta.concrete_fields
+        ]
+
+    def get_export_headers(self, queryset, fields):
+        """
+        Return the header line of the CSV, the verbose names of the fields.
+        """
+        headers = list()
+
+        for name in fields:
+            try:
+                field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                headers.append(name)
+            else:
+                headers.append(
+                    force_text(getattr(field, 'verbose_name', name))
+                )
+
+        return headers
+
+    def get_export_filename(self, queryset, export_format):
+        if self.export_filename:
+            return '%s.%s' % (self.export_filename, export_format)
+
+        return '%s.%s' % (
+            queryset.model._meta.model_name, export_format
+        )
+
+    def export(self, export_format):
+        queryset = self.get_export_queryset()
+        fields = self.get_export_fields(queryset)
+        chunk_size = self.export_chunk_size
+        rows = iterate_values(queryset, fields, chunk_size)
+
+        if export_format == 'csv':
+            content = stream_csv(
+                rows, self.get_export_headers(queryset, fields), chunk_size,
+                escape_formulas=self.export_escape_formulas
+            )
+        else:
+            content = stream_json_lines(rows, fields, chunk_size)
+
+        response = StreamingHttpResponse(
+            content, content_type=self.export_content_types[export_format]
+        )
+        response['Content-Disposition'] = 'attachment; filename="%s"' % (
+            self.get_export_filename(queryset, export_format)
+        )
+
+        return response
+
+    def get(self, request, *args, **kwargs):
+        export_format = self.get_export_format()
+
+        if export_format:
+            return self.export(export_format)
+
+        return super(ExportMixin, self).get(request, *args, **kwargs)
+
+
+class AutoPrefetchMixin(object):
+    """
+    Mixin for :class:`~django.views.generic.list.ListView` classes that
+    learns which relations the template uses for each object, and applies
+    the matching ``select_related()`` and ``prefetch_related()`` on the
+    next requests to avoid one query per object.
+
+    The plan is learned on the first render, or on every render while
+    ``prefetch_learning`` is ``True``, and kept in the cache. Inspect it with
+    :meth:`get_prefetch_plan` and set ``prefetch_plan`` to override it.
+
+    A learning render is slower: it prefetches every many valued relation
+    of the model, one query each, to find the ones the template uses, see
+    :class:`~boilerplate.utils.PrefetchRecorder`.
+
+    **Example**
+    ::
+        class ActorList(AutoPrefetchMixin, ListView):
+            model = Actor
+
+        ActorList().get_prefetch_plan()
+        # {'select_related': ('contact_information', ),
+        #  'prefetch_related': ()}
+    """
+    prefetch_plan = None
+    prefetch_learning = False
+    prefetch_cache_alias = 'default'
+    prefetch_cache_timeout = None
+
+    def get_prefetch_plan_key(self):
+        return 'boilerplate.prefetch.%s.%s' % (
+            self.__class__.__module__, self.__class__.__name__
+        )
+
+    def get_prefetch_plan(self):
+        """
+        Return the ``prefetch_plan`` or the learned plan, ``None`` when there
+        is nothing learned yet.
+        """
+        if self.prefetch_plan is not None:
+            return self.prefetch_plan
+
+        return caches[self.prefetch_cache_alias].get(
+            self.get_prefetch_plan_key()
+        )
+
+    def set_prefetch_plan(self, plan):
+        caches[self.prefetch_cache_alias].set(
+            self.get_prefetch_plan_key(), plan, self.prefetch_cache_timeout
+        )
+
+    def is_prefetch_learning(self):
+        if self.prefetch_plan is not None:
+            return False
+
+        return self.prefetch_learning or self.get_prefetch_plan() is None
+
+    def get_queryset(self):
+        queryset = super(AutoPrefetchMixin, self).get_queryset()
+        self.prefetch_recorder = None
+
+        if self.is_prefetch_learning():
+            self.prefetch_recorder = PrefetchRecorder(queryset.model)
+
+            return self.prefetch_recorder.get_queryset(queryset)
+
+        plan = self.get_prefetch_plan()
+
+        if plan['select_related']:
+            queryset = queryset.select_related(*plan['select_related'])
+
+        if plan['prefetch_related']:
+            queryset = queryset.prefetch_related(*plan['prefetch_related'])
+
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super(AutoPrefetchMixin, self).get_context_data(**kwargs)
+
+        if getattr(self, 'prefetch_recorder', None) is not None:
+            self.prefetch_objects = list(context['object_list'])
+            self.prefetch_recorder.watch(self.prefetch_objects)
+
+        return context
+
+    def learn_prefetch_plan(self, response):
+        if self.prefetch_objects:
+            self.set_prefetch_plan(
+                self.prefetch_recorder.get_plan(self.prefetch_objects)
+            )
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super(AutoPrefetchMixin, self).render_to_response(
+            context, **response_kwargs
+        )
+
+        if getattr(self, 'prefetch_recorder', None) is not None:
+            response.add_post_render_callback(self.learn_prefetch_plan)
+
+        return response
+
+
+class QueryInstrumentationMixin(object):
+    """
+    Mixin for any view classes that counts the queries and the SQL time of
+    each request, grouped by the boilerplate method that executed them:
+    ``get_parent``, ``get_extra_forms``, ``get_deleted_objects``... and
+    ``render`` for the template, see
+    :class:`~boilerplate.instrumentation.QueryRecord`.
+
+    The counts are logged to the ``boilerplate.queries`` logger, with the
+    record fields in the log record, and sent in the ``Server-Timing``
+    header. A log record over ``query_budget`` is a warning, in the tests
+    use :func:`~boilerplate.instrumentation.assert_query_budget`.
+
+    The queries of a template response are counted when Django renders it,
+    the record is logged and the header added after the render.
+
+    **Example**
+    ::
+        class ActorList(QueryInstrumentationMixin, ListView):
+            model = Actor
+            query_budget = {'total': 3, 'render': 0}
+    """
+    query_budget = None
+    query_server_timing = True
+
+    def get_query_budget(self):
+        return self.query_budget
+
+    def log_query_record(self, record):
+        record.log(path=self.request.path)
+
+    def finish_query_record(self, response, record):
+        self.log_query_record(record)
+
+        if self.query_server_timing:
+            response['Server-Timing'] = record.get_server_timing()
+
+    def dispatch(self, request, *args, **kwargs):
+        record = QueryRecord(
+            self.__class__.__name__, budget=self.get_query_budget()
+        )
+
+        with record:
+            response = super(QueryInstrumentationMixin, self).dispatch(
+                request, *args, **kwargs
+            )
+
+        response.query_record = record
+
+        def render(render):
+            record.stack.append('render')
+
+            try:
+                with record:
+                    return render()
+            finally:
+                record.stack.pop()
+                self.finish_query_record(response, record)
+
+        if not wrap_render(response, render):
+            self.finish_query_record(response, record)
+
+        return response
+
+
+class CProfileMixin(object):
+    """
+    Mixin for any view classes that runs a sample of the requests,
+    ``profile_sample_rate``, or the requests with a signed profile header
+    under ``cProfile`` and saves the ``.pstats`` dump, like
+    :class:`~boilerplate.middleware.CProfileMiddleware` for a single view.
+
+    Only profiled requests change: their template response is profiled when
+    Django renders it, after the ``process_template_response`` of the
+    middlewares, and ``profile_path`` is set on the response then.
+
+    **Example**
+    ::
+        class ActorList(CProfileMixin, ListView):
+            model = Actor
+            profile_sample_rate = 0.01
+    """
+    profile_sample_rate = None
+
+    def get_profile_sample_rate(self):
+        return self.profile_sample_rate
+
+    def dispatch(self, request, *args, **kwargs):
+        dispatch = super(CProfileMixin, self).dispatch
+
+        if not should_profile(request, self.get_profile_sample_rate()):
+            return dispatch(request, *args, **kwargs)
+
+        return profile_view(
+            request, get_view_name(self), dispatch, request, *args, **kwargs
+        )
+
+
+class ConditionalGetMixin(object):
+    """
+    Mixin for :class:`~django.views.generic.list.ListView` and
+    :class:`~django.views.generic.detail.DetailView` classes that answers
+    ``304 Not Modified`` to conditional ``GET`` requests before the view
+    builds its queryset, forms or context.
+
+    Lists are validated by the maximum ``last_modified_field`` and the count
+    of ``get_queryset()``, one aggregate query, in the ``ETag`` only: a
+    ``Last-Modified`` would not change when a row is deleted. Detail views
+    are validated by the ``version_field`` of the object, or
+    ``last_modified_field``, fetching only those fields, in the ``ETag`` and
+    ``Last-Modified`` headers. The ``cache_control`` directives and
+    ``stale_while_revalidate`` are added to the responses.
+
+    **Example**
+    ::
+        class ActorList(ConditionalGetMixin, ListView):
+            cache_control = {'private': True, 'max_age': 0}
+            model = Actor
+            stale_while_revalidate = 60
+    """
+    last_modified_field = 'updated'
+    version_field = None
+    cache_control = None
+    stale_while_revalidate = None
+
+    def is_conditional_detail(self):
+        return hasattr(self, 'get_object') and any(
+            self.kwargs.get(getattr(self, name, default)) is not None
+            for name, default in (
+                ('pk_url_kwarg', 'pk'), ('slug_url_kwarg', 'slug')
+            )
+        )
+
+    def get_conditional_fields(self, model):
+        """
+        Return the existing fields among ``version_field`` and
+        ``last_modified_field``.
+        """
+        fields = list()
+
+        for name in (self.version_field, self.last_modified_field):
+            if not name:
+                continue
+
+            try:
+                model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+
+            fields.append(name)
+
+        return fields
+
+    def get_conditional_key(self):
+        """
+        Return what the validators depend on besides the data, by default
+        the current user since pages usually show it.
+        """
+        user = getattr(self.request, 'user', None)
+
+        return [str(getattr(user, 'pk', None))]
+
+    def get_validators(self):
+        """
+        Return the ``(etag, last modified datetime)`` of the page, without
+        quotes, ``(None, None)`` when the model has none of the fields. Lists
+        have no last modified datetime.
+        """
+        queryset = self.get_queryset()
+        fields = self.get_conditional_fields(queryset.model)
+        key = self.get_conditional_key()
+        last_modified = None
+
+        if self.is_conditional_detail():
+            if not fields:
+                return None, None
+
+            # only() can't defer the relations of select_related()
+            obj = self.get_object(
+                queryset.select_related(None).only(*fields)
+            )
+            key += [str(obj.pk)] + [
+                str(getattr(obj, name)) for name in fields
+            ]
+
+            if self.last_modified_field in fields:
+                last_modified = getattr(obj, self.last_modified_field)
+        else:
+            if self.last_modified_field not in fields:
+                return None, None
+
+            data = queryset.order_by().aggregate(
+                count=Count('pk'),
+                last_modified=Max(self.last_modified_field),
+            )
+            key += [str(data['count']), str(data['last_modified'])]
+
+        etag = hashlib.md5(force_bytes(':'.join(key))).hexdigest()
+
+        return etag, last_modified
+
+    def get_last_modified_timestamp(self, last_modified):
+        """
+        Return the epoch seconds of a ``last_modified_field`` value, dates
+        are the start of the day and naive datetimes are in the current time
+        zone.
+        """
+        if last_modified is None:
+            return None
+
+        if not isinstance(last_modified, datetime.datetime):
+            last_modified = datetime.datetime.combine(
+                last_modified, datetime.time.min
+            )
+
+        if timezone.is_naive(last_modified):
+            last_modified = timezone.make_aware(last_modified)
+
+        return timegm(last_modified.utctimetuple())
+
+    def get_cache_control(self):
+        cache_control = dict(self.cache_control or {})
+
+        if self.stale_while_revalidate is not None:
+            cache_control['stale_while_revalidate'] = (
+                self.stale_while_revalidate
+            )
+
+        return cache_control
+
+    def set_conditional_headers(self, response, etag, last_modified):
+        if etag and not response.has_header('ETag'):
+            response['ETag'] = quote_etag(etag)
+
+        if last_modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(
+                self.get_last_modified_timestamp(last_modified)
+            )
+
+        cache_control = self.get_cache_control()
+
+        if cache_control:
+            patch_cache_control(response, **cache_control)
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = None
+
+        if etag:
+            response = get_conditional_response(
+                request,
+                etag=quote_etag(etag),
+                last_modified=self.get_last_modified_timestamp(
+                    last_modified
+                ),
+            )
+
+        if response is None:
+            response = super(ConditionalGetMixin, self).get(
+                request, *args, **kwargs
+            )
+
+        self.set_conditional_headers(response, etag, last_modified)
+
+        return response
+
+
 class UserCreateMixin(object):
     field_user = 'user'
 
@@ -163,7 +796,168 @@ class CRUDMessageMixin(object):
                 )
                 return reverse_lazy(url_name, args=[self.object.pk, ])
 
-        return super(CRUDMessageMixin, self).get_success_url()
+        return super(CRUDMessageMixin, self).get_success_url()
+
+
+class ImportMixin(CRUDMessageMixin):
+    """
+    Mixin for :class:`~django.views.generic.edit.FormView` classes that
+    imports the rows of an uploaded CSV file, the header line has the names
+    of the fields of ``form_class``.
+
+    The file is read as a stream and the rows are validated with
+    ``form_class`` in batches of ``import_batch_size``. The valid rows of
+    each batch are inserted with ``bulk_create()`` in their own transaction,
+    so only one batch of forms is in memory at a time. The errors of the
+    invalid rows, up to ``import_max_errors``, are shown in the "context" as
+    ``import_errors``, a list of ``(line, errors)``.
+
+    The file is decoded with ``import_encoding``, by default ``utf-8-sig``
+    to skip the byte order mark of the CSV files saved by Excel. The objects
+    chosen in the model choice fields of each batch are fetched with one
+    ``in_bulk()`` per field, set ``import_cache_choices`` to ``False`` to
+    validate them row by row.
+
+    **Example**
+    ::
+        class ActorImport(ImportMixin, FormView):
+            form_class = ActorForm
+            success_url = reverse_lazy('store:actor_list')
+            template_name = 'store/actor_import.html'
+    """
+    message_action = 'imported'
+    success_message = _(
+        '%(count)s %(model)s have been %(action)s successfully.'
+    )
+    import_form_class = ImportForm
+    import_batch_size = 500
+    import_max_errors = 100
+    import_encoding = 'utf-8-sig'
+    import_cache_choices = True
+
+    def get_form_class(self):
+        return self.import_form_class
+
+    def get_row_form_class(self):
+        """
+        Return the form class to validate each row.
+        """
+        return self.form_class
+
+    def get_import_rows(self, file):
+        """
+        Yield the line number and the data of each row of ``file``.
+        """
+        reader = csv.DictReader(
+            codecs.getreader(self.import_encoding)(file)
+        )
+
+        for row in reader:
+            yield reader.line_num, row
+
+    def get_row_data(self, row):
+        """
+        Return the form data of a row, override to rename the columns.
+        """
+        return row
+
+    def add_import_error(self, line, errors):
+        self.import_error_count += 1
+
+        if len(self.import_errors) < self.import_max_errors:
+            self.import_errors.append((line, errors))
+
+    def save_import_batch(self, batch):
+        """
+        Save the valid forms of a batch in one transaction. The instances are
+        inserted with ``bulk_create()``, unless the form has many to many
+        fields that need the instance saved.
+        """
+        model = batch[0][1]._meta.model
+        many_to_many = set(
+            field.name for field in model._meta.many_to_many
+        ) & set(batch[0][1].fields)
+
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                if many_to_many:
+                    for line, form in batch:
+                        form.save()
+                else:
+                    model._default_manager.bulk_create(
+                        [form.save(commit=False) for line, form in batch]
+                    )
+        except IntegrityError as e:
+            for line, form in batch:
+                self.add_import_error(line, ErrorDict({
+                    NON_FIELD_ERRORS: form.error_class([str(e)])
+                }))
+        else:
+            self.imported_count += len(batch)
+
+    def import_rows(self, rows):
+        form_class = self.get_row_form_class()
+        batch = list()
+        self.imported_count = 0
+        self.import_error_count = 0
+        self.import_errors = list()
+
+        for line, row in rows:
+            batch.append((line, form_class(data=self.get_row_data(row))))
+
+            if len(batch) >= self.import_batch_size:
+                self.import_batch(batch)
+                batch = list()
+
+        if batch:
+            self.import_batch(batch)
+
+    def import_batch(self, batch):
+        if self.import_cache_choices:
+            cache_batch_choices([form for line, form in batch])
+
+        valid = list()
+
+        for line, form in batch:
+            if form.is_valid():
+                valid.append((line, form))
+            else:
+                self.add_import_error(line, form.errors)
+
+        if valid:
+            self.save_import_batch(valid)
+
+    def get_success_message(self, cleaned_data=None):
+        model = self.get_row_form_class()._meta.model
+
+        return self.success_message % dict(
+            count=self.imported_count,
+            model=model._meta.verbose_name_plural,
+            action=self.message_action,
+        )
+
+    def form_valid(self, form):
+        self.object = None
+
+        try:
+            self.import_rows(self.get_import_rows(form.cleaned_data['file']))
+        except (csv.Error, UnicodeError) as e:
+            form.add_error('file', str(e))
+
+            return self.form_invalid(form)
+
+        if not self.import_error_count:
+            return super(ImportMixin, self).form_valid(form)
+
+        if self.imported_count:
+            messages.success(self.request, self.get_success_message())
+
+        return self.render_to_response(self.get_context_data(
+            form=form,
+            import_errors=self.import_errors,
+            import_error_count=self.import_error_count,
+            imported_count=self.imported_count,
+        ))
 
 
 class CreateMessageMixin(CRUDMessageMixin):
@@ -197,17 +991,55 @@ class DeleteMessageMixin(CRUDMessageMixin):
     Mixin for :class:`~django.views.generic.edit.DeleteView` classes that
     adds a success message after the action is completed successfully.
 
+    Set ``delete_preview_limit`` to count the objects to delete per model
+    with aggregate queries and list at most that number of them per model,
+    ``truncated`` is added to the context when some are not listed.
+
+    Set ``fast_delete`` to delete the object and its cascade with a
+    ``DELETE`` per model instead of loading every row, see
+    :func:`~boilerplate.utils.fast_delete_objects`. It falls back to
+    ``Model.delete()`` when a model of the cascade has delete signal
+    receivers or there are protected rows.
+
+    Set ``background_delete`` to only schedule the deletion with a
+    :class:`~boilerplate.models.DeletionTask` and return immediately, the
+    ``process_deletions`` management command deletes the object and its
+    cascade in batches. The task is available as ``deletion_task``. It
+    requires ``'boilerplate'`` in ``INSTALLED_APPS`` and its migrations
+    applied, the other features of the mixin don't.
+
     **Example**
     ::
         class ModelSendEmail(DeleteMessageMixin, DeleteView):
             model = Model
+            delete_preview_limit = 10
+            fast_delete = True
     """
     message_action = 'deleted'
+    background_message_action = 'scheduled for deletion'
+    delete_preview_limit = None
+    fast_delete = False
+    background_delete = False
 
     def delete(self, request, *args, **kwargs):
-        response = super(DeleteMessageMixin, self).delete(
-            request, *args, **kwargs
-        )
+        if self.background_delete:
+            # Imported here so the mixins don't require the boilerplate models
+            from .models import DeletionTask
+
+            self.object = self.get_object()
+            success_url = self.get_success_url()
+            self.deletion_task = DeletionTask.schedule(self.object)
+            self.message_action = self.background_message_action
+            response = HttpResponseRedirect(success_url)
+        elif self.fast_delete:
+            self.object = self.get_object()
+            success_url = self.get_success_url()
+            fast_delete_objects([self.object])
+            response = HttpResponseRedirect(success_url)
+        else:
+            response = super(DeleteMessageMixin, self).delete(
+                request, *args, **kwargs
+            )
 
         success_message = self.get_success_message()
 
@@ -216,17 +1048,33 @@ class DeleteMessageMixin(CRUDMessageMixin):
 
         return response
 
+    def get_delete_preview_limit(self):
+        return self.delete_preview_limit
+
+    @profiled('DeleteMessageMixin.get_context_data')
     def get_context_data(self, **kwargs):
-        to_delete, model_count, perms_needed, protected = get_deleted_objects(
-            [self.object], self.request
-        )
+        limit = self.get_delete_preview_limit()
+
+        if limit is None:
+            to_delete, model_count, perms_needed, protected = (
+                get_deleted_objects([self.object], self.request)
+            )
+            truncated = False
+        else:
+            to_delete, model_count, perms_needed, protected, truncated = (
+                get_deleted_objects_summary(
+                    [self.object], self.request, limit
+                )
+            )
+
         objects_name = model_ngettext(self.object)
 
         kwargs.update({
             'objects_name': objects_name,
             'to_delete': [to_delete],
             'model_count': dict(model_count).items(),
-            'protected': protected
+            'protected': protected,
+            'truncated': truncated,
         })
         return super().get_context_data(**kwargs)
 
@@ -249,9 +1097,51 @@ class ExtraFormsAndFormsetsMixin(object):
                 (form.AddressFormSet),
                 (form.PhoneFormSet),
             )
+
+    The object is fetched with ``select_related`` on the one-to-one and
+    foreign key lookup fields of ``extra_form_list``, set
+    ``extra_form_select_related`` to ``False`` to disable it.
+
+    The querysets of the model choice fields of the formsets are evaluated
+    once per request and shared among all the forms, set
+    ``formset_cache_choices`` to ``False`` to disable it.
+
+    Set ``formset_bulk_save`` to save the formsets in bulk, see
+    :func:`~boilerplate.utils.bulk_save_formset`. The changed rows skip
+    ``Model.save()`` and the model signals. The new rows skip them only on
+    databases that return the primary keys of ``bulk_create``, like
+    PostgreSQL, and are saved one by one with their signals on SQLite or
+    MySQL. Override :meth:`get_formset_bulk_save` to save a formset row by
+    row when its model relies on ``Model.save()`` or signals.
+
+    Set ``formset_skip_unchanged`` to skip the validation of the existing
+    rows that were not changed.
+
+    Set ``formset_paginate_by`` to render only a page of the existing rows
+    of the model formsets, the page is read from the ``<prefix>-page``
+    parameter. Further pages are rendered alone with
+    ``?_partial=<prefix>&<prefix>-page=<number>``, their rows are numbered
+    after the previous pages so they can be appended to the same formset.
+    On submission only the rows sent are validated and saved.
+
+    Fragments of the page are rendered with ``partial_template_name`` when
+    the ``_partial`` parameter is in the query string:
+
+    - ``GET ?_partial=<prefix>&_row=<index>``: an empty row of a formset.
+    - ``POST ?_partial=<prefix>``: validates only the extra form or the
+      formset with that prefix and renders it with its errors, nothing is
+      saved.
     """
     extra_form_list = None
     formset_list = None
+    formset_cache_choices = True
+    formset_bulk_save = False
+    formset_skip_unchanged = False
+    formset_paginate_by = None
+    extra_form_select_related = True
+    partial_param = '_partial'
+    partial_row_param = '_row'
+    partial_template_name = None
 
     def get_extra_form_list(self):
         """
@@ -266,14 +1156,57 @@ class ExtraFormsAndFormsetsMixin(object):
         """
         return self.formset_list
 
-    def get_extra_forms(self, form_list=None):
+    def get_extra_form_select_related(self, model):
         """
-        Returns a list of each extra forms to be used in this view.
+        Returns the lookup fields of the extra forms that can be loaded with
+        the object through ``select_related``: forward foreign keys and
+        one-to-one relations in both directions.
         """
         output = list()
 
+        if not self.extra_form_select_related:
+            return output
+
+        for entry in self.get_extra_form_list() or ():
+            try:
+                field = model._meta.get_field(entry[0])
+            except FieldDoesNotExist:
+                continue
+
+            if field.one_to_one or (field.many_to_one and field.concrete):
+                output.append(entry[0])
+
+        return output
+
+    def get_queryset(self):
+        """
+        Loads the relations of the extra forms with the object.
+        """
+        qs = super(ExtraFormsAndFormsetsMixin, self).get_queryset()
+        select_related = self.get_extra_form_select_related(qs.model)
+
+        if select_related:
+            qs = qs.select_related(*select_related)
+
+        return qs
+
+    @instrumented
+    def get_extra_forms(self, form_list=None):
+        """
+        Returns a list of each extra forms to be used in this view.
+
+        The extra forms of :meth:`get_extra_form_list` are built once per
+        request and reused on every call.
+        """
         if form_list is None:
-            form_list = self.get_extra_form_list()
+            if getattr(self, '_extra_forms', None) is None:
+                self._extra_forms = self.get_extra_forms(
+                    self.get_extra_form_list() or ()
+                )
+
+            return self._extra_forms
+
+        output = list()
 
         if form_list:
             for lookup_field, relation_field, extra_form in form_list:
@@ -286,21 +1219,344 @@ class ExtraFormsAndFormsetsMixin(object):
 
         return output
 
+    @instrumented
     def get_formsets(self, formset_list=None):
         """
         Returns a list of formsets to be used in this view.
-        """
-        output = list()
 
+        The formsets of :meth:`get_formset_list` are built once per request
+        and reused on every call.
+        """
         if formset_list is None:
-            formset_list = self.get_formset_list()
+            if getattr(self, '_formsets', None) is None:
+                self._formsets = self.get_formsets(
+                    self.get_formset_list() or ()
+                )
+
+            return self._formsets
+
+        output = list()
 
         if formset_list:
-            for formset in formset_list:
-                output.append(formset(**self.get_formset_kwargs()))
+            for formset_class in formset_list:
+                kwargs = self.get_formset_kwargs()
+                queryset = self.get_formset_queryset(formset_class)
+
+                if queryset is not None:
+                    kwargs['queryset'] = queryset
+
+                formset = formset_class(**kwargs)
+                self.paginate_formset(formset)
+
+                if self.formset_cache_choices:
+                    self.cache_formset_choices(formset)
+
+                if self.formset_skip_unchanged:
+                    self.skip_unchanged_forms(formset)
+
+                output.append(formset)
+
+        return output
+
+    def get_formset_paginate_by(self, formset_class):
+        """
+        Returns the number of existing rows to render per page of a model
+        formset, ``None`` to render all of them.
+        """
+        if getattr(formset_class, 'model', None) is None:
+            return None
+
+        return self.formset_paginate_by
+
+    def get_formset_base_queryset(self, formset_class):
+        """
+        Returns the ordered queryset with every existing row of a model
+        formset.
+        """
+        model = formset_class.model
+        qs = model._default_manager.get_queryset()
+        fk = getattr(formset_class, 'fk', None)
+
+        if fk is not None:
+            if getattr(self, 'object', None) is None:
+                return qs.none()
+
+            qs = qs.filter(**{fk.name: self.object})
+
+        if not qs.ordered:
+            qs = qs.order_by(model._meta.pk.name)
+
+        return qs
+
+    def get_formset_page(self, formset_class):
+        """
+        Returns the requested page of the existing rows of a model formset.
+        """
+        if getattr(self, '_formset_pages', None) is None:
+            self._formset_pages = dict()
+
+        prefix = formset_class.get_default_prefix()
+
+        if prefix not in self._formset_pages:
+            paginator = Paginator(
+                self.get_formset_base_queryset(
+                    formset_class
+                ).values_list('pk', flat=True),
+                self.get_formset_paginate_by(formset_class)
+            )
+            self._formset_pages[prefix] = paginator.get_page(
+                self.request.GET.get('{}-page'.format(prefix))
+            )
+
+        return self._formset_pages[prefix]
+
+    def get_formset_submitted_pks(self, formset_class):
+        """
+        Returns the primary keys of the existing rows submitted for a model
+        formset.
+        """
+        prefix = formset_class.get_default_prefix()
+        pk = formset_class.model._meta.pk
+        data = self.request.POST
+        output = list()
+
+        try:
+            initial_forms = int(data.get('{}-INITIAL_FORMS'.format(prefix)))
+        except (TypeError, ValueError):
+            return output
+
+        for i in range(min(initial_forms, formset_class.absolute_max)):
+            value = data.get('{}-{}-{}'.format(prefix, i, pk.name))
+
+            try:
+                value = pk.to_python(value)
+            except ValidationError:
+                continue
+
+            if value is not None:
+                output.append(value)
 
         return output
 
+    def get_formset_queryset(self, formset_class):
+        """
+        Returns the queryset of a paginated model formset: the submitted rows
+        on POST or the requested page otherwise. Returns ``None`` to keep the
+        default queryset of the formset.
+        """
+        if not self.get_formset_paginate_by(formset_class):
+            return None
+
+        qs = self.get_formset_base_queryset(formset_class)
+
+        if self.request.method in ('POST', 'PUT'):
+            pks = self.get_formset_submitted_pks(formset_class)
+        else:
+            pks = list(self.get_formset_page(formset_class).object_list)
+
+        return qs.filter(pk__in=pks)
+
+    def paginate_formset(self, formset):
+        """
+        Adds the ``paginator`` and the ``page`` of the existing rows to an
+        unbound paginated formset. While there are more pages the formset
+        has no extra rows, so the rows of the next pages can be appended.
+        """
+        if formset.is_bound or not self.get_formset_paginate_by(
+            formset.__class__
+        ):
+            return
+
+        formset.page = self.get_formset_page(formset.__class__)
+        formset.paginator = formset.page.paginator
+
+        if formset.page.has_next():
+            formset.extra = 0
+
+    def get_partial_formset(self, prefix):
+        """
+        Builds only the formset of this view with the given prefix.
+        """
+        for formset_class in self.get_formset_list() or ():
+            if formset_class.get_default_prefix() == prefix:
+                return self.get_formsets([formset_class])[0]
+
+        raise Http404
+
+    def get_partial_extra_form(self, prefix):
+        """
+        Builds only the extra form of this view with the given prefix.
+        """
+        for entry in self.get_extra_form_list() or ():
+            if entry[0] == prefix:
+                return self.get_extra_forms([entry])[0][1]
+
+        raise Http404
+
+    def render_fragment(self, content, **kwargs):
+        """
+        Renders a fragment of the page with the ``partial_template_name``,
+        or returns ``content`` if there isn't one.
+        """
+        if not self.partial_template_name:
+            return HttpResponse(content)
+
+        kwargs.update({
+            'view': self,
+            'object': self.object,
+        })
+
+        return self.response_class(
+            request=self.request,
+            template=[self.partial_template_name],
+            context=kwargs,
+            using=self.template_engine,
+        )
+
+    def render_formset_page(self, formset):
+        """
+        Renders only the rows of the requested page of a formset, numbered
+        after the rows of the previous pages.
+        """
+        page = getattr(formset, 'page', None)
+        offset = page.start_index() - 1 if page and page.object_list else 0
+
+        for i, form in enumerate(formset.forms):
+            form.prefix = formset.add_prefix(i + offset)
+
+        return self.render_fragment(
+            ''.join(str(form) for form in formset.forms),
+            formset=formset, forms=formset.forms, page=page,
+        )
+
+    def render_formset_row(self, formset, index):
+        """
+        Renders a single empty row of a formset with the given index.
+        """
+        form = formset.form(
+            auto_id=formset.auto_id,
+            prefix=formset.add_prefix(index),
+            empty_permitted=True,
+            use_required_attribute=False,
+            **formset.get_form_kwargs(None)
+        )
+        formset.add_fields(form, None)
+
+        if self.formset_cache_choices:
+            if getattr(self, '_formset_choices', None) is None:
+                self._formset_choices = dict()
+
+            cache_model_choices([form], self._formset_choices)
+
+        return self.render_fragment(
+            str(form), formset=formset, forms=[form], form=form,
+        )
+
+    def validate_partial(self, name):
+        """
+        Validates only the extra form or the formset with the given prefix
+        and renders it with its errors.
+        """
+        try:
+            form = self.get_partial_extra_form(name)
+        except Http404:
+            formset = self.get_partial_formset(name)
+            self.is_form_valid(formset)
+
+            return self.render_fragment(
+                str(formset.non_form_errors()) + str(formset),
+                formset=formset, forms=formset.forms,
+            )
+
+        self.is_form_valid(form)
+
+        return self.render_fragment(str(form), form=form)
+
+    def render_partial(self, name):
+        """
+        Renders the fragment requested with the ``partial_param``: the
+        validation of an extra form or a formset on POST, an empty row of a
+        formset when ``partial_row_param`` is sent or a page of its rows.
+        """
+        if self.request.method in ('POST', 'PUT'):
+            return self.validate_partial(name)
+
+        formset = self.get_partial_formset(name)
+        index = self.request.GET.get(self.partial_row_param)
+
+        if index is None:
+            return self.render_formset_page(formset)
+
+        try:
+            index = int(index)
+        except ValueError:
+            raise Http404
+
+        return self.render_formset_row(formset, index)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Handles GET requests, rendering only a fragment of the page when the
+        ``partial_param`` is sent.
+        """
+        name = request.GET.get(self.partial_param)
+
+        if not name:
+            return super(ExtraFormsAndFormsetsMixin, self).get(
+                request, *args, **kwargs
+            )
+
+        try:
+            self.object = self.get_object()
+        except Exception:
+            self.object = None
+
+        return self.render_partial(name)
+
+    def cache_formset_choices(self, formset):
+        """
+        Evaluates each model choice queryset once per request and shares
+        the choices among every form of the formset.
+        """
+        if getattr(self, '_formset_choices', None) is None:
+            self._formset_choices = dict()
+
+        cache_model_choices(formset.forms, self._formset_choices)
+
+    def skip_unchanged_forms(self, formset):
+        """
+        Marks the existing rows of a bound formset that were not changed as
+        valid, without running ``full_clean`` on them. Their initial values
+        are kept as ``cleaned_data`` so the changed rows are still checked
+        against them by ``validate_unique``.
+        """
+        if not formset.is_bound:
+            return
+
+        for form in formset.initial_forms:
+            if form.instance.pk is not None and not form.has_changed():
+                form._errors = ErrorDict()
+                form.cleaned_data = dict(
+                    (name, form.initial.get(name, field.initial))
+                    for name, field in form.fields.items()
+                )
+
+    @instrumented
+    def is_form_valid(self, form):
+        """
+        Returns the validity of a form or a formset, it is checked only once
+        per request.
+        """
+        if getattr(self, '_valid_forms', None) is None:
+            self._valid_forms = dict()
+
+        key = id(form)
+
+        if key not in self._valid_forms:
+            self._valid_forms[key] = form.is_valid()
+
+        return self._valid_forms[key]
+
     def get_extra_form_kwargs(self, lookup_field):
         """
         Returns the keyword arguments for instantiating each extra form.
@@ -340,6 +1596,7 @@ class ExtraFormsAndFormsetsMixin(object):
 
         return kwargs
 
+    @profiled('ExtraFormsAndFormsetsMixin.post')
     def post(self, request, *args, **kwargs):
         """
         Handles POST requests, instantiating a form instance with the passed
@@ -350,23 +1607,29 @@ class ExtraFormsAndFormsetsMixin(object):
         except Exception:
             self.object = None
 
+        name = request.GET.get(self.partial_param)
+
+        if name:
+            return self.render_partial(name)
+
         form = self.get_form()
         extra_forms = self.get_extra_forms()
         formsets = self.get_formsets()
 
-        if not form.is_valid():
+        if not self.is_form_valid(form):
             return self.form_invalid(form, extra_forms, formsets)
 
         for relation_field, extra_form in extra_forms:
-            if not extra_form.is_valid():
+            if not self.is_form_valid(extra_form):
                 return self.form_invalid(form, extra_forms, formsets)
 
         for formset in formsets:
-            if not formset.is_valid():
+            if not self.is_form_valid(formset):
                 return self.form_invalid(form, extra_forms, formsets)
 
         return self.form_valid(form, extra_forms, formsets)
 
+    @profiled('ExtraFormsAndFormsetsMixin.form_valid')
     def form_valid(self, form, extra_forms=None, formsets=None):
         """
         If the form is valid, redirect to the supplied URL.
@@ -383,7 +1646,7 @@ class ExtraFormsAndFormsetsMixin(object):
                 for relation_field, extra_form in extra_forms:
                     setattr(extra_form.instance, relation_field, self.object)
 
-                    if not extra_form.is_valid():
+                    if not self.is_form_valid(extra_form):
                         raise IntegrityError
 
                     extra_form.save()
@@ -391,16 +1654,41 @@ class ExtraFormsAndFormsetsMixin(object):
                 for formset in formsets:
                     formset.instance = self.object
 
-                    if not formset.is_valid():
+                    if not self.is_form_valid(formset):
                         raise IntegrityError
 
-                    formset.save()
+                    self.save_formset(formset)
         except Exception as e:
             form.add_error(None, e)
             return self.form_invalid(form, extra_forms, formsets)
 
         return response
 
+    def get_formset_bulk_save(self, formset):
+        """
+        Returns ``True`` if the formset has to be saved in bulk.
+
+        Formsets with many to many fields are always saved row by row.
+        """
+        if not self.formset_bulk_save:
+            return False
+
+        many_to_many = set(
+            field.name for field in formset.model._meta.many_to_many
+        )
+
+        return not many_to_many.intersection(formset.form.base_fields)
+
+    @instrumented
+    def save_formset(self, formset):
+        """
+        Saves a valid formset, in bulk or row by row.
+        """
+        if self.get_formset_bulk_save(formset):
+            return bulk_save_formset(formset)
+
+        return formset.save()
+
     def form_invalid(self, form, extra_forms=None, formsets=None):
         """
         If the form or the extra forms are invalid, re-render the context
@@ -443,6 +1731,10 @@ class ParentMixin(object):
     :class:`~django.views.generic.edit.UpdateView` classes that
     adds a success message after the action is completed successfully.
 
+    The parent is resolved once per request and reused by every method
+    that calls :meth:`get_parent`. Use ``parent_select_related`` and
+    ``parent_only`` to narrow the query that fetches it.
+
     **Example**
     ::
         class ProfileUpdate(ParentMixin, UpdateView):
@@ -450,14 +1742,93 @@ class ParentMixin(object):
             parent_model = User
             parent_lookup_arg = 'pk_parent'
             parent_lookup_field = 'pk'
+            parent_select_related = ('group', )
+            parent_only = ('username', 'group__name')
+
+    Nested URLs can declare a ``parent_chain`` instead, from the outermost
+    parent to the direct one. Each entry is a tuple of the model, the URL
+    keyword argument, the relation to the previous entry and, optionally,
+    the lookup field (``pk`` by default). The whole chain is validated with
+    a single query and added to the context as ``parent_objects``.
+
+    **Example**
+    ::
+        class CastUpdate(ParentMixin, UpdateView):
+            model = Cast
+            parent_chain = (
+                (Studio, 'pk_studio', None),
+                (Movie, 'pk_movie', 'studio'),
+            )
     """
     parent_model = None
     parent_lookup_arg = 'pk_parent'
     parent_lookup_field = 'pk'
+    parent_select_related = None
+    parent_only = None
+    parent_chain = None
 
     def get_parent_model(self):
+        chain = self.get_parent_chain()
+
+        if self.parent_model is None and chain:
+            return chain[-1][0]
+
         return self.parent_model
 
+    def get_parent_chain(self):
+        return self.parent_chain
+
+    def get_parent_chain_lookups(self, prefix=None):
+        """
+        Returns the filter keyword arguments that validate the whole chain of
+        parents and the path to ``select_related`` all the ancestors, both
+        relative to ``prefix`` or to the direct parent.
+        """
+        kwargs = {}
+        path = prefix
+
+        for entry in reversed(self.get_parent_chain()):
+            lookup_arg, relation = entry[1], entry[2]
+            lookup_field = entry[3] if len(entry) > 3 else 'pk'
+
+            key = '{}__{}'.format(path, lookup_field) if path else lookup_field
+            kwargs[key] = self.kwargs[lookup_arg]
+
+            if relation:
+                path = '{}__{}'.format(path, relation) if path else relation
+
+        return kwargs, path
+
+    def get_parent_select_related(self):
+        return self.parent_select_related
+
+    def get_parent_only(self):
+        return self.parent_only
+
+    def get_parent_queryset(self):
+        """
+        Returns the queryset used to fetch the parent object.
+        """
+        qs = self.get_parent_model()._default_manager.all()
+
+        if self.get_parent_chain():
+            kwargs, path = self.get_parent_chain_lookups()
+
+            if path:
+                qs = qs.select_related(path)
+
+        select_related = self.get_parent_select_related()
+
+        if select_related:
+            qs = qs.select_related(*select_related)
+
+        only = self.get_parent_only()
+
+        if only:
+            qs = qs.only(*only)
+
+        return qs
+
     def get_parent_lookup_arg(self):
         return self.parent_lookup_arg
 
@@ -465,6 +1836,10 @@ class ParentMixin(object):
         return self.parent_lookup_field
 
     def get_parent_kwargs(self):
+        if self.get_parent_chain():
+            kwargs, path = self.get_parent_chain_lookups()
+            return kwargs
+
         kwargs = {
             self.get_parent_lookup_field(): self.kwargs[
                 self.get_parent_lookup_arg()
@@ -473,15 +1848,45 @@ class ParentMixin(object):
 
         return kwargs
 
+    @instrumented
     def get_parent(self):
-        return get_object_or_404(
-            self.get_parent_model(), **self.get_parent_kwargs()
-        )
+        """
+        Returns the parent object, it is fetched only once per request.
+        """
+        if getattr(self, '_parent_object', None) is None:
+            self._parent_object = get_object_or_404(
+                self.get_parent_queryset(), **self.get_parent_kwargs()
+            )
+
+        return self._parent_object
+
+    @instrumented
+    def get_parent_objects(self):
+        """
+        Returns the list of parents from the outermost to the direct one,
+        following the relations already loaded with the direct parent.
+        """
+        chain = self.get_parent_chain()
+        parent = self.get_parent()
+
+        if not chain:
+            return [parent]
+
+        output = [parent]
+
+        for entry in reversed(chain[1:]):
+            parent = getattr(parent, entry[2])
+            output.insert(0, parent)
+
+        return output
 
     def get_context_data(self, **kwargs):
         if 'parent_object' not in kwargs:
             kwargs['parent_object'] = self.get_parent()
 
+        if 'parent_objects' not in kwargs and self.get_parent_chain():
+            kwargs['parent_objects'] = self.get_parent_objects()
+
         return super(ParentMixin, self).get_context_data(**kwargs)
 
 
@@ -509,14 +1914,72 @@ class ParentCreateExtraMixin(ParentCreateMixin):
 
 
 class ParentSingleObjectMixin(ParentMixin):
+    """
+    Mixin for :class:`~django.views.generic.detail.DetailView`,
+    :class:`~django.views.generic.edit.UpdateView` or
+    :class:`~django.views.generic.edit.DeleteView` classes that limits the
+    object to the children of the parent.
+
+    Set ``parent_single_query`` to filter the child directly through the
+    relation, a single query returns the object and its parent.
+
+    **Example**
+    ::
+        class ProfileDetail(ParentSingleObjectMixin, DetailView):
+            model = Profile
+            parent_model = User
+            parent_relation_field = 'user'
+            parent_single_query = True
+    """
     parent_relation_field = None
+    parent_single_query = False
 
     def get_parent_relation_field(self):
         return self.parent_relation_field
 
+    def get_parent_single_query(self):
+        return self.parent_single_query
+
+    @instrumented
+    def get_parent(self):
+        obj = getattr(self, 'object', None)
+
+        if (
+            self.get_parent_single_query() and
+            obj is not None and
+            getattr(self, '_parent_object', None) is None
+        ):
+            self._parent_object = getattr(
+                obj, self.get_parent_relation_field()
+            )
+
+        return super(ParentSingleObjectMixin, self).get_parent()
+
     def get_queryset(self):
         qs = super(ParentSingleObjectMixin, self).get_queryset()
 
+        if self.get_parent_single_query():
+            relation_field = self.get_parent_relation_field()
+
+            if self.get_parent_chain():
+                kwargs, path = self.get_parent_chain_lookups(relation_field)
+            else:
+                kwargs = {
+                    '{}__{}'.format(
+                        relation_field, self.get_parent_lookup_field()
+                    ): self.kwargs[self.get_parent_lookup_arg()],
+                }
+                path = relation_field
+
+            select_related = [path]
+
+            for field in self.get_parent_select_related() or ():
+                select_related.append(
+                    '{}__{}'.format(relation_field, field)
+                )
+
+            return qs.select_related(*select_related).filter(**kwargs)
+
         kwargs = {
             self.get_parent_relation_field(): self.get_parent(),
         }
@@ -6,16 +6,23 @@ try:
 except ImportError:
     from io import StringIO
 
+from django.contrib.contenttypes.models import ContentType
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage as storage
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
 
 from PIL import Image
 import six
 
+from .instrumentation import profiled
+from .utils import QuerySetCollector, delete_objects_in_batches
+
 
 class ModelImageThumbs(object):
     IMAGESIZES = None
 
+    @profiled('ModelImageThumbs.save')
     def save(self, *args, **kwargs):
         response = super(ModelImageThumbs, self).save(*args, **kwargs)
 
@@ -42,3 +49,120 @@ class ModelImageThumbs(object):
                 field.delete(save=True)
 
         return response
+
+
+@six.python_2_unicode_compatible
+class DeletionTask(models.Model):
+    """
+    An object scheduled to be deleted in the background, in batches, by the
+    ``process_deletions`` management command.
+
+    **Example**
+    ::
+        task = DeletionTask.schedule(movie)
+        ...
+        task.refresh_from_db()
+        task.get_progress()
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, _('Pending')),
+        (STATUS_RUNNING, _('Running')),
+        (STATUS_DONE, _('Done')),
+        (STATUS_FAILED, _('Failed')),
+    )
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=255)
+    object_repr = models.CharField(max_length=200)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING,
+        db_index=True
+    )
+    total = models.PositiveIntegerField(null=True, blank=True)
+    deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('created', )
+        verbose_name = _('deletion task')
+        verbose_name_plural = _('deletion tasks')
+
+    def __str__(self):
+        return '%s (%s)' % (self.object_repr, self.get_status_display())
+
+    @classmethod
+    def schedule(cls, obj):
+        """
+        Schedule the deletion of an object, unless it is already scheduled.
+        """
+        task, created = cls.objects.get_or_create(
+            content_type=ContentType.objects.get_for_model(obj),
+            object_id=str(obj.pk),
+            status__in=(cls.STATUS_PENDING, cls.STATUS_RUNNING),
+            defaults={
+                'object_repr': str(obj)[:200],
+            }
+        )
+
+        return task
+
+    @classmethod
+    def for_object(cls, obj):
+        """
+        Return the tasks of an object, the newest first.
+        """
+        return cls.objects.filter(
+            content_type=ContentType.objects.get_for_model(obj),
+            object_id=str(obj.pk),
+        ).order_by('-created')
+
+    def get_progress(self):
+        """
+        Return the percentage of deleted rows.
+        """
+        if self.status == self.STATUS_DONE:
+            return 100
+
+        if not self.total:
+            return 0
+
+        return min(100, self.deleted * 100 // self.total)
+
+    def run(self, batch_size=1000):
+        """
+        Delete the object in batches, saving the progress after each one.
+        """
+        model = self.content_type.model_class()
+
+        try:
+            obj = model._base_manager.get(pk=self.object_id)
+        except model.DoesNotExist:
+            obj = None
+
+        self.status = self.STATUS_RUNNING
+        self.save(update_fields=('status', 'updated'))
+
+        try:
+            if obj is not None:
+                collector = QuerySetCollector(using=self._state.db)
+                collector.collect([obj])
+                self.total = self.deleted + collector.count()
+                self.save(update_fields=('total', 'updated'))
+
+                for count in delete_objects_in_batches([obj], batch_size):
+                    self.deleted += count
+                    self.save(update_fields=('deleted', 'updated'))
+        except Exception as e:
+            self.status = self.STATUS_FAILED
+            self.error = str(e)
+            self.save(update_fields=('status', 'error', 'updated'))
+            raise
+
+        self.status = self.STATUS_DONE
+        self.save(update_fields=('status', 'updated'))
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+import base64
+import binascii
+import hashlib
+import json
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+from django.core.cache import caches
+from django.core.exceptions import (
+    EmptyResultSet, FieldDoesNotExist, ImproperlyConfigured, ValidationError
+)
+from django.core.paginator import (
+    EmptyPage, InvalidPage, Page, PageNotAnInteger, Paginator
+)
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
+from django.utils.translation import ugettext_lazy as _
+
+import six
+
+
+class KeysetPage(Sequence):
+    """
+    A page of a :class:`KeysetPaginator`, it has no number, instead it
+    knows the cursors to the next and previous pages.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Page %s objects>' % len(self)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_cursor(self):
+        """
+        Return the cursor of the next page or ``None``.
+        """
+        if not self.has_next() or not self.object_list:
+            return None
+
+        return self.paginator.encode_cursor(
+            self.paginator.NEXT, self.object_list[-1]
+        )
+
+    def previous_cursor(self):
+        """
+        Return the cursor of the previous page or ``None``.
+        """
+        if not self.has_previous() or not self.object_list:
+            return None
+
+        return self.paginator.encode_cursor(
+            self.paginator.PREVIOUS, self.object_list[0]
+        )
+
+
+class KeysetPaginator(object):
+    """
+    Paginate a queryset with cursors built from the values of the
+    ordering fields of the first and last rows of a page, so every page is
+    fetched with a ``WHERE`` over the ordering and a ``LIMIT``, without
+    ``OFFSET`` or ``COUNT(*)``.
+
+    The ordering defaults to the ordering of the queryset or the model
+    ``Meta.ordering``, the primary key is added to it when it is missing so
+    the ordering is unique. The ordering fields should not be nullable.
+
+    **Example**
+    ::
+        paginator = KeysetPaginator(Actor.objects.all(), 30)
+        page = paginator.page(request.GET.get('cursor'))
+    """
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, queryset, per_page, ordering=None,
+                 cursor_param='cursor'):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.cursor_param = cursor_param
+        self.fields = self.get_fields(ordering)
+
+    def get_fields(self, ordering=None):
+        """
+        Return the list of ``(field name, descending)`` of the ordering.
+        """
+        model = self.queryset.model
+
+        if not ordering:
+            ordering = self.queryset.query.order_by or model._meta.ordering
+
+        fields = list()
+
+        for name in ordering:
+            if not isinstance(name, six.string_types) or name == '?':
+                raise ImproperlyConfigured(
+                    '%s only supports ordering by field names, got %r.' % (
+                        self.__class__.__name__, name
+                    )
+                )
+
+            fields.append((name.lstrip('-'), name.startswith('-')))
+
+        names = [name for name, descending in fields]
+        pk = model._meta.pk
+
+        if not set(names) & set(['pk', pk.name, pk.attname]):
+            fields.append(('pk', False))
+
+        return fields
+
+    def get_model_field(self, name):
+        """
+        Return the model field of an ordering ``name``, following the
+        relations of lookups, or ``None`` when it isn't a field.
+        """
+        model = self.queryset.model
+        field = None
+
+        for part in name.split(LOOKUP_SEP):
+            if model is None:
+                return None
+
+            try:
+                field = (
+                    model._meta.pk if part == 'pk'
+                    else model._meta.get_field(part)
+                )
+            except FieldDoesNotExist:
+                return None
+
+            model = field.related_model
+
+        return field
+
+    def get_ordering(self, reverse=False):
+        return [
+            '%s%s' % ('-' if descending != reverse else '', name)
+            for name, descending in self.fields
+        ]
+
+    def get_values(self, obj):
+        values = list()
+
+        for name, descending in self.fields:
+            value = obj
+
+            for attr in name.split(LOOKUP_SEP):
+                value = getattr(value, attr)
+
+            values.append(value)
+
+        return values
+
+    def get_filter(self, values, reverse=False):
+        """
+        Return the condition of the rows after ``values`` in the ordering,
+        or before them when ``reverse``.
+        """
+        query = Q()
+        equal = dict()
+
+        for (name, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            kwargs = dict(equal)
+            kwargs['%s__%s' % (name, lookup)] = value
+            query |= Q(**kwargs)
+            equal[name] = value
+
+        return query
+
+    def encode_cursor(self, direction, obj):
+        data = json.dumps(
+            [direction, self.get_values(obj)],
+            cls=DjangoJSONEncoder,
+            separators=(',', ':'),
+        )
+        cursor = base64.urlsafe_b64encode(data.encode('utf-8'))
+
+        return cursor.decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            data = base64.urlsafe_b64decode(
+                (cursor + '=' * (-len(cursor) % 4)).encode('ascii')
+            )
+            direction, values = json.loads(data.decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise InvalidPage(_('Invalid cursor.'))
+
+        if (
+            direction not in (self.NEXT, self.PREVIOUS) or
+            not isinstance(values, list) or
+            len(values) != len(self.fields) or
+            any(isinstance(value, (dict, list)) for value in values)
+        ):
+            raise InvalidPage(_('Invalid cursor.'))
+
+        return direction, self.to_python(values)
+
+    def to_python(self, values):
+        """
+        Return the cursor ``values`` converted by their model fields, raise
+        ``InvalidPage`` when one of them is not valid.
+        """
+        converted = list()
+
+        for (name, descending), value in zip(self.fields, values):
+            field = self.get_model_field(name)
+
+            try:
+                if value is None:
+                    raise ValueError
+                if field is not None:
+                    value = field.to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise InvalidPage(_('Invalid cursor.'))
+
+            converted.append(value)
+
+        return converted
+
+    def page(self, cursor=None):
+        """
+        Return the :class:`KeysetPage` of ``cursor``, the first page when
+        ``cursor`` is empty.
+        """
+        direction, values = self.NEXT, None
+
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+
+        reverse = direction == self.PREVIOUS
+        queryset = self.queryset
+
+        if values is not None:
+            queryset = queryset.filter(self.get_filter(values, reverse))
+
+        object_list = list(
+            queryset.order_by(*self.get_ordering(reverse))[:self.per_page + 1]
+        )
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+
+        if reverse:
+            object_list.reverse()
+
+            return KeysetPage(object_list, self, True, has_more)
+
+        return KeysetPage(object_list, self, has_more, values is not None)
+
+
+def get_estimated_count(queryset):
+    """
+    Return the number of rows of ``queryset`` estimated by the database
+    planner, or ``None`` when the database has no estimate for it.
+
+    PostgreSQL estimates any queryset with ``EXPLAIN``, MySQL only estimates
+    unfiltered querysets from ``information_schema``.
+    """
+    connection = connections[queryset.db]
+
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+
+            if isinstance(plan, six.string_types):
+                plan = json.loads(plan)
+
+            return int(plan[0]['Plan']['Plan Rows'])
+
+        if connection.vendor == 'mysql' and not queryset.query.where:
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+
+            if row and row[0] is not None:
+                return int(row[0])
+
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids the ``COUNT(*)`` of large querysets.
+
+    The count is the planner estimate when it is at least
+    ``estimate_threshold`` rows. Smaller querysets are counted exactly, and
+    when the database has no estimate the exact count is cached for
+    ``count_cache_timeout`` seconds. With an estimate the number of pages is
+    approximate, so the last pages may be missing or empty.
+
+    **Example**
+    ::
+        class ActorList(ListView):
+            model = Actor
+            paginate_by = 30
+            paginator_class = EstimatedCountPaginator
+    """
+    estimate_threshold = 10000
+    count_cache_alias = 'default'
+    count_cache_timeout = 300
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, estimate_threshold=None,
+                 count_cache_timeout=None):
+        super(EstimatedCountPaginator, self).__init__(
+            object_list, per_page, orphans, allow_empty_first_page
+        )
+        self.estimated = False
+
+        if estimate_threshold is not None:
+            self.estimate_threshold = estimate_threshold
+
+        if count_cache_timeout is not None:
+            self.count_cache_timeout = count_cache_timeout
+
+    def get_estimated_count(self):
+        return get_estimated_count(self.object_list)
+
+    def get_count_cache_key(self):
+        sql, params = self.object_list.query.sql_with_params()
+        key = force_bytes('%s:%s:%r' % (self.object_list.db, sql, params))
+
+        return 'boilerplate.count.%s' % hashlib.md5(key).hexdigest()
+
+    def get_cached_count(self):
+        cache = caches[self.count_cache_alias]
+        key = self.get_count_cache_key()
+        count = cache.get(key)
+
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, self.count_cache_timeout)
+
+        return count
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return len(self.object_list)
+
+        estimate = self.get_estimated_count()
+
+        if estimate is None:
+            return self.get_cached_count()
+
+        if estimate >= self.estimate_threshold:
+            self.estimated = True
+
+            return estimate
+
+        return self.object_list.count()
+
+
+class HasNextPage(Page):
+    """
+    A page of a :class:`HasNextPaginator`.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super(HasNextPage, self).__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self) - 1
+
+
+class HasNextPaginator(Paginator):
+    """
+    Paginator without any count, each page fetches one extra row to know
+    whether there is a next page. There is no total: ``count`` and
+    ``num_pages`` are ``None`` and ``page_range`` only has the pages up to
+    the last page fetched and the next one, so the templates should link to
+    the previous and next pages.
+
+    **Example**
+    ::
+        class ActorList(ListView):
+            model = Actor
+            paginate_by = 30
+            paginator_class = HasNextPaginator
+    """
+    count = None
+    num_pages = None
+    known_pages = 0
+
+    @property
+    def page_range(self):
+        """
+        Return the 1-based range of the pages known to exist, without a
+        count.
+        """
+        return range(1, self.known_pages + 1)
+
+    def get_elided_page_range(self, number=1, **kwargs):
+        return iter(self.page_range)
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+
+        return number
+
+    def get_page(self, number):
+        try:
+            number = self.validate_number(number)
+        except (PageNotAnInteger, EmptyPage):
+            number = 1
+
+        return self.page(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page + self.orphans
+        object_list = list(self.object_list[bottom:top + 1])
+
+        if not object_list and (
+            number > 1 or not self.allow_empty_first_page
+        ):
+            raise EmptyPage(_('That page contains no results'))
+
+        has_next = len(object_list) > self.per_page + self.orphans
+
+        if has_next:
+            object_list = object_list[:self.per_page]
+
+        self.known_pages = max(self.known_pages, number + int(has_next))
+
+        return HasNextPage(object_list, number, self, has_next)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import cProfile
+import os
+import random
+import re
+import tempfile
+import time
+
+from django.core import signing
+
+from .boilerplate import get_boilerplate_setting
+from .instrumentation import wrap_render
+
+PROFILE_DIR = get_boilerplate_setting(
+    'profile_dir',
+    os.path.join(tempfile.gettempdir(), 'boilerplate-profiles')
+)
+PROFILE_HEADER = get_boilerplate_setting(
+    'profile_header', 'HTTP_X_BOILERPLATE_PROFILE'
+)
+PROFILE_MAX_DUMPS = get_boilerplate_setting('profile_max_dumps', 100)
+PROFILE_SAMPLE_RATE = get_boilerplate_setting('profile_sample_rate', 0)
+PROFILE_TOKEN_MAX_AGE = get_boilerplate_setting('profile_token_max_age', 3600)
+PROFILE_SALT = 'boilerplate.profiling'
+
+DUMP_RE = re.compile(r'^[0-9]+\.[0-9]+@[^@]+@[^@]+\.pstats$')
+
+
+def get_profile_token():
+    """
+    Return a signed value for the profile header, valid for
+    ``profile_token_max_age`` seconds.
+
+    **Example**
+    ::
+        curl -H "X-Boilerplate-Profile: $TOKEN" https://example.com/actors/
+    """
+    return signing.dumps('profile', salt=PROFILE_SALT)
+
+
+def is_valid_profile_token(token):
+    try:
+        signing.loads(token, salt=PROFILE_SALT, max_age=PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+
+    return True
+
+
+def should_profile(request, sample_rate=None):
+    """
+    Return if ``request`` should be profiled: it has a valid signed profile
+    header, or it is sampled with ``sample_rate``, by default the
+    ``profile_sample_rate`` setting. A request is only profiled once.
+    """
+    if getattr(request, '_boilerplate_profiled', False):
+        return False
+
+    token = request.META.get(PROFILE_HEADER)
+
+    if token and is_valid_profile_token(token):
+        return True
+
+    if sample_rate is None:
+        sample_rate = PROFILE_SAMPLE_RATE
+
+    return bool(sample_rate) and random.random() < sample_rate
+
+
+def get_view_name(view):
+    """
+    Return the name of the class of a view function or instance.
+    """
+    if isinstance(view, type):
+        return view.__name__
+
+    view_class = getattr(view, 'view_class', None)
+
+    if view_class is not None:
+        return view_class.__name__
+
+    if hasattr(view, '__name__'):
+        return view.__name__
+
+    return view.__class__.__name__
+
+
+def clean_dump_name(value):
+    """
+    Return ``value`` usable in a dump file name, the ``:`` of the URL
+    namespaces are replaced by ``.``.
+    """
+    return re.sub(r'[^\w.-]+', '_', value.replace(':', '.'))
+
+
+def get_dump_filename(url_name, view_name):
+    return '%.6f@%s@%s.pstats' % (
+        time.time(), clean_dump_name(url_name or '-'),
+        clean_dump_name(view_name)
+    )
+
+
+def parse_dump_filename(filename):
+    """
+    Return the ``(time, url name, view name)`` of a dump file name.
+    """
+    name = os.path.basename(filename)[:-len('.pstats')]
+    timestamp, url_name, view_name = name.split('@', 2)
+
+    return float(timestamp), url_name, view_name
+
+
+def get_dumps(directory=None):
+    """
+    Return the paths of the dumps, from the oldest to the newest.
+    """
+    directory = directory or PROFILE_DIR
+
+    if not os.path.isdir(directory):
+        return list()
+
+    names = [
+        name for name in os.listdir(directory) if DUMP_RE.match(name)
+    ]
+
+    return [
+        os.path.join(directory, name) for name in sorted(
+            names, key=lambda name: parse_dump_filename(name)[0]
+        )
+    ]
+
+
+def save_profile(profile, url_name, view_name, directory=None,
+                 max_dumps=None):
+    """
+    Save ``profile`` as a ``.pstats`` dump and remove the oldest dumps over
+    ``max_dumps``. Return the path of the dump.
+    """
+    directory = directory or PROFILE_DIR
+
+    if max_dumps is None:
+        max_dumps = PROFILE_MAX_DUMPS
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    path = os.path.join(directory, get_dump_filename(url_name, view_name))
+    profile.dump_stats(path)
+
+    dumps = get_dumps(directory)
+
+    for old in dumps[:max(0, len(dumps) - max_dumps)]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+    return path
+
+
+def profile_view(request, view_name, func, *args, **kwargs):
+    """
+    Call ``func`` under ``cProfile`` and save the dump with the URL name of
+    ``request`` and ``view_name``. A template response is also profiled
+    when Django renders it, the dump is saved after the render.
+    """
+    request._boilerplate_profiled = True
+    profile = cProfile.Profile()
+    response = profile.runcall(func, *args, **kwargs)
+
+    def save():
+        resolver_match = getattr(request, 'resolver_match', None)
+        response.profile_path = save_profile(
+            profile, getattr(resolver_match, 'view_name', None), view_name
+        )
+
+    def render(render):
+        try:
+            return profile.runcall(render)
+        finally:
+            save()
+
+    if not wrap_render(response, render):
+        save()
+
+    return response
@@ -5,10 +5,11 @@ try:
     from django.urls import reverse
 except ImportError:
     from django.core.urlresolvers import reverse
-from django.db import DEFAULT_DB_ALIAS
+from django.db import router
 from django.utils.text import slugify
 
 from ..boilerplate import get_boilerplate_setting
+from ..utils import QuerySetCollector
 
 register = template.Library()
 
@@ -23,15 +24,70 @@ def url_replace(request, field, value):
     return dict_.urlencode()
 
 
+@register.simple_tag
+def cursor_replace(request, page, direction='next'):
+    """
+    **Tag name**
+    ::
+        cursor_replace
+
+    Return the query string of the ``next`` or ``previous`` page of a
+    :class:`~boilerplate.pagination.KeysetPage`, keeping the rest of the
+    query string like ``url_replace``.
+
+    **Usage**
+    ::
+        {% cursor_replace request page_obj direction %}
+
+    **Example**
+    ::
+        {% if page_obj.has_next %}
+            <a href="?{% cursor_replace request page_obj 'next' %}">Next</a>
+        {% endif %}
+    """
+    if direction == 'previous':
+        cursor = page.previous_cursor()
+    else:
+        cursor = page.next_cursor()
+
+    dict_ = request.GET.copy()
+    dict_.pop(page.paginator.cursor_param, None)
+
+    if cursor:
+        dict_[page.paginator.cursor_param] = cursor
+
+    return dict_.urlencode()
+
+
 @register.filter
-def get_deleted_objects(object):
+def get_deleted_objects(object, limit=None):
     """
     List the related objects before delete an object
+
+    With a ``limit`` at most that number of related objects are loaded and
+    listed, without nesting.
+
+    **Usage**
+    ::
+        {{ object|get_deleted_objects|unordered_list }}
+        {{ object|get_deleted_objects:100|unordered_list }}
     """
-    collector = NestedObjects(using=DEFAULT_DB_ALIAS)
+    using = router.db_for_write(object._meta.model)
+
+    if limit is None:
+        collector = NestedObjects(using=using)
+        collector.collect([object])
+
+        return collector.nested()
+
+    collector = QuerySetCollector(using=using)
     collector.collect([object])
+    children = collector.sample(int(limit))
+
+    if children:
+        return [object, children]
 
-    return collector.nested()
+    return [object]
 
 
 """
@@ -1,35 +1,117 @@
 # -*- coding: utf-8 -*-
+import base64
+import cProfile
+import datetime
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import skipIf
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 try:
     from StringIO import StringIO
 except ImportError:
     from io import StringIO
 
 from django import forms
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
 from django.contrib.messages import get_messages
 from django.contrib.messages.storage import default_storage
 from django.core.exceptions import PermissionDenied
 from django.db.models import signals
 from django.forms import inlineformset_factory
+from django.http import Http404, HttpResponse
 from django.contrib.admin.models import LogEntry
 from django.contrib.auth.models import (
-    AnonymousUser, ContentType, Permission, User
+    AnonymousUser, ContentType, Group, Permission, User
 )
-from django.test import RequestFactory, TestCase
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+try:
+    from django.urls import path, re_path as url, reverse
+except ImportError:
+    from django.conf.urls import url
+    from django.core.urlresolvers import reverse
+    path = None
 try:
     from django.template import engines
 except ImportError:
     from django.template.engines import Engine
-from django.views.generic import DetailView, TemplateView
-from django.views.generic.edit import CreateView, DeleteView, UpdateView
+from django.utils import timezone
+from django.views.generic import DetailView, ListView, TemplateView
+from django.views.generic.edit import (
+    CreateView, DeleteView, FormView, UpdateView
+)
 
 from .mail import SendEmail
+from . import profiling
+from .middleware import CProfileMiddleware, StageProfileMiddleware
+from .models import DeletionTask
 from .mixins import (
-    NoLoginRequiredMixin, ActionListMixin, UserCreateMixin, CreateMessageMixin,
-    UpdateMessageMixin, DeleteMessageMixin, ExtraFormsAndFormsetsMixin,
-    ParentCreateMixin, ParentSingleObjectMixin
+    NoLoginRequiredMixin, ActionListMixin, AutoPrefetchMixin, CProfileMixin,
+    ConditionalGetMixin, UserCreateMixin, CreateMessageMixin,
+    UpdateMessageMixin, DeleteMessageMixin, ExportMixin,
+    ExtraFormsAndFormsetsMixin, ImportMixin,
+    KeysetPaginationMixin, PaginateCountMixin, ParentMixin, ParentCreateMixin,
+    ParentSingleObjectMixin, QueryInstrumentationMixin
 )
+from .instrumentation import assert_query_budget, profiler
+from .pagination import EstimatedCountPaginator
 from .signals import add_view_permissions
+from .templatetags.boilerplate import (
+    get_deleted_objects as get_deleted_objects_filter
+)
+from .utils import (
+    AbsoluteURLCache, bulk_save_formset, get_relation_graph,
+    get_relation_node
+)
+
+
+class URLObject(object):
+    calls = 0
+    url_name = 'object_detail'
+
+    def __init__(self, pk, parent_pk=None):
+        self.pk = pk
+        self.parent_pk = parent_pk
+
+    def get_absolute_url(self):
+        URLObject.calls += 1
+
+        if self.parent_pk:
+            return reverse('object_child', args=[self.parent_pk, self.pk])
+
+        return reverse(self.url_name, kwargs={'pk': self.pk})
+
+
+class PathURLObject(URLObject):
+    url_name = 'path_object_detail'
+
+
+class NoURLObject(object):
+    pk = 1
+
+
+urlpatterns = [
+    url(r'^objects/(?P<pk>[0-9]+)/$', TemplateView.as_view(),
+        name='object_detail'),
+    url(r'^objects/([0-9]+)/children/([0-9]+)/$', TemplateView.as_view(),
+        name='object_child'),
+]
+
+if path is not None:
+    urlpatterns.append(
+        path('path-objects/<int:pk>/', TemplateView.as_view(),
+             name='path_object_detail')
+    )
 
 
 class TestModelForm(forms.ModelForm):
@@ -50,6 +132,27 @@ TestFormSet = inlineformset_factory(
 )
 
 
+class NoUniqueQueryForm(forms.ModelForm):
+    """
+    Leaves the unique checks to the formset, without a query per row.
+    """
+    class Meta:
+        fields = '__all__'
+        model = Permission
+
+    def validate_unique(self):
+        pass
+
+
+NoUniqueQueryFormSet = inlineformset_factory(
+    ContentType,
+    Permission,
+    form=NoUniqueQueryForm,
+    fields='__all__',
+    min_num=0
+)
+
+
 def render_template(text, context=None):
     """
     Create a template ``text`` that first loads boilerplate.
@@ -254,6 +357,37 @@ class TemplateTest(TestCase):
         self.assertEqual('auth:user_list', res)
 
 
+class DeletedObjectsFilterTest(TestCase):
+    def setUp(self):
+        self.content_type = ContentType.objects.create(
+            app_label='boilerplate', model='filter',
+        )
+        self.permissions = [
+            Permission.objects.create(
+                content_type=self.content_type,
+                codename='test_%s' % i,
+                name='Test %s' % i,
+            ) for i in range(5)
+        ]
+
+    def test_get_deleted_objects(self):
+        res = get_deleted_objects_filter(self.content_type)
+        self.assertEqual(res[0], self.content_type)
+        self.assertEqual(len(res[1]), 5)
+
+    def test_get_deleted_objects_limit(self):
+        with self.assertNumQueries(1):
+            res = get_deleted_objects_filter(self.content_type, '2')
+
+        self.assertEqual(res, [self.content_type, self.permissions[:2]])
+
+        res = render_template_with_object(
+            self.content_type,
+            '{{ object|get_deleted_objects:2|unordered_list }}'
+        )
+        self.assertEqual(res.count('<li>'), 3)
+
+
 class SignalTest(TestCase):
     def test_migration_output(self):
         signals.post_migrate.connect(add_view_permissions)
@@ -273,6 +407,96 @@ class ActionListView(ActionListMixin, TemplateView):
     template_name = 'any_template.html'
 
 
+class KeysetListView(KeysetPaginationMixin, ListView):
+    paginate_by = 2
+    template_name = 'any_template.html'
+
+    def get_queryset(self):
+        return Permission.objects.filter(
+            content_type__app_label='keyset'
+        ).select_related('content_type')
+
+
+class KeysetDescendingListView(KeysetListView):
+    ordering = '-codename'
+
+
+class KeysetLogEntryListView(KeysetPaginationMixin, ListView):
+    model = LogEntry
+    ordering = '-action_time'
+    paginate_by = 2
+    template_name = 'any_template.html'
+
+
+class PaginateCountView(PaginateCountMixin, ListView):
+    paginate_by = 2
+    template_name = 'any_template.html'
+
+    def get_queryset(self):
+        return Permission.objects.filter(
+            codename__startswith='count_'
+        ).order_by('codename')
+
+
+class PaginateHasNextView(PaginateCountView):
+    paginate_count = 'none'
+
+
+class ExportView(ExportMixin, ListView):
+    export_chunk_size = 2
+    export_fields = ('codename', 'name', 'content_type__model')
+    model = Permission
+    ordering = '-codename'
+    template_name = 'any_template.html'
+
+    def get_queryset(self):
+        return super(ExportView, self).get_queryset().filter(
+            codename__startswith='count_'
+        )
+
+    def get_ordering(self):
+        return self.request.GET.get('ordering', self.ordering)
+
+
+class PermissionForm(forms.ModelForm):
+    class Meta:
+        fields = ('name', 'content_type', 'codename')
+        model = Permission
+
+
+class ImportView(ImportMixin, FormView):
+    form_class = PermissionForm
+    import_batch_size = 2
+    success_url = '/fake-path-success'
+    template_name = 'any_template.html'
+
+
+class AutoPrefetchView(AutoPrefetchMixin, ListView):
+    queryset = Permission.objects.filter(
+        codename__startswith='count_'
+    ).order_by('codename')
+    template = (
+        '{% for object in object_list %}'
+        '{{ object.content_type.app_label }}'
+        '{% for group in object.group_set.all %}{{ group.name }}{% endfor %}'
+        '{% endfor %}'
+    )
+
+    def get_template_names(self):
+        return engines['django'].from_string(self.template)
+
+
+class AutoPrefetchReverseView(AutoPrefetchView):
+    queryset = User.objects.order_by('username')
+    template = (
+        '{% for object in object_list %}'
+        '{% for entry in object.logentry_set.all %}'
+        '{{ entry.object_repr }}'
+        '{% endfor %}'
+        '{% endfor %}'
+    )
+
+
 class UserCreateView(UserCreateMixin, CreateView):
     fields = (
         'content_type', 'object_id', 'object_repr', 'action_flag',
@@ -322,6 +546,24 @@ class DeleteMessageView(DeleteMessageMixin, DeleteView):
         return self.render_to_response({})
 
 
+class DeletePreviewView(DeleteMessageMixin, DeleteView):
+    delete_preview_limit = 2
+    model = ContentType
+    template_name = 'any_template.html'
+
+
+class FastDeleteView(DeleteMessageMixin, DeleteView):
+    fast_delete = True
+    model = ContentType
+    success_url = '/fake-path-success'
+
+
+class BackgroundDeleteView(DeleteMessageMixin, DeleteView):
+    background_delete = True
+    model = ContentType
+    success_url = '/fake-path-success'
+
+
 class ParentCreateView(ParentCreateMixin, CreateView):
     fields = ('codename', 'name')
     model = Permission
@@ -340,6 +582,27 @@ class ParentSingleObjectView(ParentSingleObjectMixin, DetailView):
     parent_relation_field = 'content_type'
 
 
+class ParentSingleQueryView(ParentSingleObjectView):
+    parent_single_query = True
+
+
+class InstrumentedParentView(
+    QueryInstrumentationMixin, ParentSingleObjectView
+):
+    query_budget = {'total': 3, 'get_parent': 1}
+
+    def get_template_names(self):
+        return engines['django'].from_string('{{ object.content_type }}')
+
+
+class ParentChainView(ParentMixin, TemplateView):
+    parent_chain = (
+        (ContentType, 'pk_content_type', None),
+        (Permission, 'pk_parent', 'content_type'),
+    )
+    template_name = 'any_template.html'
+
+
 class ExtraFormsAndFormsetsView(ExtraFormsAndFormsetsMixin, UpdateView):
     PermissionFormSet = inlineformset_factory(
         ContentType,
@@ -363,6 +626,58 @@ class ExtraFormsAndFormsetsView(ExtraFormsAndFormsetsMixin, UpdateView):
         return self.object
 
 
+class LogEntryFormsView(ExtraFormsAndFormsetsMixin, UpdateView):
+    LogEntryFormSet = inlineformset_factory(
+        User,
+        LogEntry,
+        fields=('content_type', 'object_repr', 'action_flag'),
+        extra=3,
+        can_delete=False,
+    )
+    fields = ('username', )
+    model = User
+    formset_list = (
+        LogEntryFormSet,
+    )
+
+
+class BulkFormsetView(ExtraFormsAndFormsetsMixin, UpdateView):
+    PermissionFormSet = inlineformset_factory(
+        ContentType,
+        Permission,
+        fields=('name', 'codename'),
+        extra=1,
+        can_delete=True,
+    )
+    fields = '__all__'
+    formset_bulk_save = True
+    model = ContentType
+    formset_list = (
+        PermissionFormSet,
+    )
+    success_url = '/fake-path-success'
+
+
+class PaginatedFormsetView(BulkFormsetView):
+    formset_bulk_save = False
+    formset_paginate_by = 2
+    template_name = 'any_template.html'
+
+
+class ContentTypeForm(forms.ModelForm):
+    class Meta:
+        fields = '__all__'
+        model = ContentType
+
+
+class ExtraFormsSelectRelatedView(ExtraFormsAndFormsetsMixin, UpdateView):
+    extra_form_list = (
+        ('content_type', 'permission', ContentTypeForm),
+    )
+    fields = '__all__'
+    model = Permission
+
+
 class ExtraFormsAndFormsetsAndUpdateView(
     ExtraFormsAndFormsetsMixin, UpdateMessageMixin, UpdateView
 ):
@@ -418,6 +733,398 @@ class MixinTest(TestCase):
             ActionListView.action_list
         )
 
+    def test_keyset_pagination_mixin(self):
+        for model in ('a', 'b'):
+            content_type = ContentType.objects.create(
+                app_label='keyset', model=model
+            )
+            for i in range(3):
+                Permission.objects.create(
+                    content_type=content_type,
+                    codename='%s_%s' % (model, i),
+                    name='%s %s' % (model, i),
+                )
+
+        codenames = ['a_0', 'a_1', 'a_2', 'b_0', 'b_1', 'b_2']
+        pages = list()
+        query = ''
+
+        while True:
+            request = self.factory.get('/fake-path?' + query)
+
+            with self.assertNumQueries(1):
+                response = KeysetListView.as_view()(request)
+
+            page = response.context_data['page_obj']
+            pages.append([obj.codename for obj in page])
+            self.assertTrue(response.context_data['is_paginated'])
+
+            if not page.has_next():
+                break
+
+            query = render_template_with_boilerplate(
+                "{% cursor_replace request page_obj 'next' %}",
+                {'request': request, 'page_obj': page}
+            )
+
+        self.assertEqual(pages, [codenames[:2], codenames[2:4], codenames[4:]])
+        self.assertTrue(page.has_previous())
+
+        query = render_template_with_boilerplate(
+            "{% cursor_replace request page_obj 'previous' %}",
+            {'request': request, 'page_obj': page}
+        )
+        request = self.factory.get('/fake-path?' + query)
+        response = KeysetListView.as_view()(request)
+        page = response.context_data['page_obj']
+        self.assertEqual([obj.codename for obj in page], codenames[2:4])
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_previous())
+
+        response = KeysetDescendingListView.as_view()(
+            self.factory.get('/fake-path')
+        )
+        page = response.context_data['page_obj']
+        self.assertEqual([obj.codename for obj in page], ['b_2', 'b_1'])
+        self.assertFalse(page.has_previous())
+
+        request = self.factory.get('/fake-path?cursor=' + page.next_cursor())
+        response = KeysetDescendingListView.as_view()(request)
+        self.assertEqual(
+            [obj.codename for obj in response.context_data['page_obj']],
+            ['b_0', 'a_2'],
+        )
+
+        request = self.factory.get('/fake-path?cursor=invalid')
+
+        with self.assertRaises(Http404):
+            KeysetListView.as_view()(request)
+
+    def test_keyset_pagination_mixin_malformed_cursor(self):
+        for view, values in (
+            (KeysetLogEntryListView, ['garbage', 1]),
+            (KeysetLogEntryListView, ['2020-01-02T00:00:00', 'garbage']),
+            (KeysetLogEntryListView, [None, 1]),
+            (KeysetListView, ['a_0', 'garbage']),
+        ):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(['n', values]).encode('utf-8')
+            ).decode('ascii')
+            request = self.factory.get('/fake-path', {'cursor': cursor})
+
+            with self.assertRaises(Http404):
+                view.as_view()(request)
+
+        cursor = base64.urlsafe_b64encode(json.dumps(
+            ['n', ['2020-01-02T00:00:00', 1]]
+        ).encode('utf-8')).decode('ascii')
+        request = self.factory.get('/fake-path', {'cursor': cursor})
+        response = KeysetLogEntryListView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+
+    def create_count_permissions(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='count'
+        )
+        for i in range(5):
+            Permission.objects.create(
+                content_type=content_type,
+                codename='count_%s' % i,
+                name='Count %s' % i,
+            )
+
+    def test_paginate_count_mixin_estimate(self):
+        self.create_count_permissions()
+        cache.clear()
+        request = self.factory.get('/fake-path')
+
+        # The database has no estimate: exact count, then cached
+        with self.assertNumQueries(1):
+            response = PaginateCountView.as_view()(request)
+
+        self.assertEqual(response.context_data['paginator'].count, 5)
+
+        with self.assertNumQueries(0):
+            response = PaginateCountView.as_view()(request)
+
+        self.assertEqual(response.context_data['paginator'].num_pages, 3)
+
+        queryset = Permission.objects.filter(codename__startswith='count_')
+        paginator = EstimatedCountPaginator(
+            queryset, 2, estimate_threshold=1000
+        )
+        paginator.get_estimated_count = lambda: 100000
+
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 100000)
+
+        self.assertTrue(paginator.estimated)
+
+        paginator = EstimatedCountPaginator(
+            queryset, 2, estimate_threshold=1000
+        )
+        paginator.get_estimated_count = lambda: 10
+
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 5)
+
+        self.assertFalse(paginator.estimated)
+
+    def test_paginate_count_mixin_has_next(self):
+        self.create_count_permissions()
+
+        with self.assertNumQueries(1):
+            response = PaginateHasNextView.as_view()(
+                self.factory.get('/fake-path')
+            )
+
+        page = response.context_data['page_obj']
+        self.assertEqual(len(page), 2)
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+        self.assertIsNone(page.paginator.count)
+        self.assertEqual(list(page.paginator.page_range), [1, 2])
+        self.assertEqual(
+            render_template(
+                '{% for number in paginator.page_range %}'
+                '{{ number }}{% endfor %}',
+                {'paginator': page.paginator}
+            ),
+            '12'
+        )
+
+        response = PaginateHasNextView.as_view()(
+            self.factory.get('/fake-path?page=3')
+        )
+        page = response.context_data['page_obj']
+        self.assertEqual([obj.codename for obj in page], ['count_4'])
+        self.assertFalse(page.has_next())
+        self.assertEqual(page.end_index(), 5)
+        self.assertEqual(list(page.paginator.page_range), [1, 2, 3])
+
+        with self.assertRaises(Http404):
+            PaginateHasNextView.as_view()(
+                self.factory.get('/fake-path?page=4')
+            )
+
+    def test_export_mixin_csv(self):
+        self.create_count_permissions()
+        request = self.factory.get('/fake-path?export=csv')
+
+        with self.assertNumQueries(0):
+            response = ExportView.as_view()(request)
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="permission.csv"'
+        )
+
+        with self.assertNumQueries(1):
+            content = b''.join(response.streaming_content).decode('utf-8')
+
+        lines = content.splitlines()
+        self.assertEqual(lines[0], 'codename,name,content_type__model')
+        self.assertEqual(lines[1], 'count_4,Count 4,count')
+        self.assertEqual(
+            [line.split(',')[0] for line in lines[1:]],
+            ['count_4', 'count_3', 'count_2', 'count_1', 'count_0']
+        )
+
+    def test_export_mixin_csv_formulas(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='formula'
+        )
+
+        for i, name in enumerate(('=1+1', '+1', '-1', '@SUM(A1)', 'a=b')):
+            Permission.objects.create(
+                content_type=content_type,
+                codename='count_%s' % i,
+                name=name,
+            )
+
+        request = self.factory.get('/fake-path?export=csv&ordering=codename')
+        response = ExportView.as_view()(request)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(
+            [line.split(',')[1] for line in content.splitlines()[1:]],
+            ["'=1+1", "'+1", "'-1", "'@SUM(A1)", 'a=b']
+        )
+
+        response = ExportView.as_view(export_escape_formulas=False)(request)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(content.splitlines()[1], 'count_0,=1+1,formula')
+
+    def test_export_mixin_json_lines(self):
+        self.create_count_permissions()
+        request = self.factory.get(
+            '/fake-path?export=jsonl&ordering=codename'
+        )
+        response = ExportView.as_view()(request)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode('utf-8').splitlines()
+        ]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0], {
+            'codename': 'count_0',
+            'name': 'Count 0',
+            'content_type__model': 'count',
+        })
+
+        request = self.factory.get('/fake-path?export=xml')
+        response = ExportView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('object_list', response.context_data)
+
+    def import_permissions(self, lines, encoding='utf-8'):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='import'
+        )
+        content = '\n'.join(
+            ['name,content_type,codename'] + [
+                line % {'pk': content_type.pk} for line in lines
+            ]
+        )
+        request = self.factory.post('/fake-path', {
+            'file': SimpleUploadedFile(
+                'permissions.csv', content.encode(encoding), 'text/csv'
+            ),
+        })
+        request._messages = default_storage(request)
+
+        return request, ImportView.as_view()(request)
+
+    def test_import_mixin(self):
+        request, response = self.import_permissions([
+            'Import %s,%%(pk)s,import_%s' % (i, i) for i in range(5)
+        ])
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            Permission.objects.filter(codename__startswith='import_').count(),
+            5
+        )
+        self.assertEqual(
+            [str(message) for message in get_messages(request)],
+            ['5 permissions have been imported successfully.']
+        )
+
+    def test_import_mixin_bom(self):
+        request, response = self.import_permissions([
+            'Import 0,%(pk)s,import_0',
+        ], encoding='utf-8-sig')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Permission.objects.filter(
+            name='Import 0', codename='import_0'
+        ).exists())
+
+    def test_import_mixin_batch_choices(self):
+        with CaptureQueriesContext(connection) as queries:
+            request, response = self.import_permissions([
+                'Import %s,%%(pk)s,import_%s' % (i, i) for i in range(4)
+            ] + ['Import 4,invalid,import_4'])
+
+        self.assertEqual(response.context_data['imported_count'], 4)
+        self.assertEqual(
+            [errors for line, errors in (
+                response.context_data['import_errors']
+            )],
+            [{'content_type': [
+                'Select a valid choice. That choice is not one of the '
+                'available choices.'
+            ]}]
+        )
+        # One in_bulk() per batch with choices, the invalid key is skipped
+        self.assertEqual(len([
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "django_content_type"')
+        ]), 2)
+
+    def test_import_mixin_errors(self):
+        request, response = self.import_permissions([
+            'Import 0,%(pk)s,import_0',
+            'Import 1,%(pk)s,',
+            'Import 2,0,import_2',
+            'Import 3,%(pk)s,import_3',
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context_data['imported_count'], 2)
+        self.assertEqual(response.context_data['import_error_count'], 2)
+        self.assertEqual(
+            [
+                (line, sorted(errors))
+                for line, errors in response.context_data['import_errors']
+            ],
+            [(3, ['codename']), (4, ['content_type'])]
+        )
+        self.assertEqual(
+            sorted(Permission.objects.filter(
+                codename__startswith='import_'
+            ).values_list('codename', flat=True)),
+            ['import_0', 'import_3']
+        )
+        self.assertEqual(len(get_messages(request)), 1)
+
+    def test_auto_prefetch_mixin(self):
+        self.create_count_permissions()
+        group = Group.objects.create(name='prefetch')
+        group.permissions.add(*Permission.objects.filter(
+            codename__startswith='count_'
+        ))
+        cache.clear()
+        request = self.factory.get('/fake-path')
+        view = AutoPrefetchView()
+        self.assertIsNone(view.get_prefetch_plan())
+
+        # Learning: the main query, two prefetches and the content types
+        with self.assertNumQueries(8):
+            content = AutoPrefetchView.as_view()(request).render().content
+
+        self.assertEqual(view.get_prefetch_plan(), {
+            'select_related': ('content_type', ),
+            'prefetch_related': ('group_set', ),
+        })
+
+        with self.assertNumQueries(2):
+            response = AutoPrefetchView.as_view()(request).render()
+
+        self.assertEqual(response.content, content)
+
+        view.prefetch_plan = {
+            'select_related': (),
+            'prefetch_related': ('group_set', ),
+        }
+        self.assertFalse(view.is_prefetch_learning())
+
+    def test_auto_prefetch_mixin_reverse_foreign_key(self):
+        content_type = ContentType.objects.get_for_model(User)
+
+        for user in (self.user, User.objects.create(username='prefetch')):
+            LogEntry.objects.create(
+                user=user, content_type=content_type,
+                object_id=str(user.pk), object_repr=user.username,
+                action_flag=1,
+            )
+
+        cache.clear()
+        request = self.factory.get('/fake-path')
+        content = AutoPrefetchReverseView.as_view()(request).render().content
+
+        self.assertEqual(AutoPrefetchReverseView().get_prefetch_plan(), {
+            'select_related': (),
+            'prefetch_related': ('logentry_set', ),
+        })
+
+        with self.assertNumQueries(2):
+            response = AutoPrefetchReverseView.as_view()(request).render()
+
+        self.assertEqual(response.content, content)
+
     def test_user_create_mixin(self):
         content_type = ContentType.objects.get(
             app_label="auth", model="user"
@@ -462,39 +1169,320 @@ class MixinTest(TestCase):
 
         self.assertEqual(len(get_messages(request)), 1)
 
-    def test_parent_create_mixin(self):
-        content_type = ContentType.objects.get(
-            app_label='contenttypes', model='contenttype',
+    def test_delete_message_mixin_preview_limit(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='preview',
         )
+        group = Group.objects.create(name='Preview')
 
-        request = self.factory.post('/fake-path', {
-            'codename': 'test_user',
-            'name': 'Test user'
+        for i in range(5):
+            group.permissions.add(Permission.objects.create(
+                content_type=content_type,
+                codename='test_%s' % i,
+                name='Test %s' % i,
+            ))
+
+        request = self.factory.get('/fake-path')
+
+        # The samples of permissions also load their content type
+        with self.assertNumQueries(9):
+            response = DeletePreviewView.as_view()(
+                request, pk=content_type.pk
+            )
+
+        context = response.context_data
+        self.assertTrue(context['truncated'])
+        self.assertEqual(dict(context['model_count']), {
+            'content types': 1,
+            'permissions': 5,
+            'group-permission relationships': 5,
         })
-        response = ParentCreateView.as_view()(
-            request,
-            pk_parent=content_type.id,
-        )
-        self.assertEqual(response.content_type, content_type)
+        self.assertEqual(context['protected'], [])
 
-    def test_parent_single_object_mixin(self):
-        content_type = ContentType.objects.get(
-            app_label='contenttypes', model='contenttype',
+        root, children = context['to_delete'][0]
+        self.assertEqual(root, 'Content type: preview')
+        self.assertEqual(children[0], 'Permissions: 5')
+        self.assertEqual(len(children[1]), 3)
+        self.assertEqual(children[1][2], '3 more permissions')
+
+    def test_delete_message_mixin_fast_delete(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='fast',
         )
-        permission, created = Permission.objects.get_or_create(
+        group = Group.objects.create(name='Fast')
+        log = LogEntry.objects.create(
+            user=self.user,
             content_type=content_type,
-            codename='test_user',
-            name='Test user'
+            object_repr='Fast',
+            action_flag=1,
         )
 
-        request = self.factory.get('/fake-path')
-        response = ParentSingleObjectView.as_view()(
-            request,
-            pk_parent=content_type.id,
+        for i in range(5):
+            group.permissions.add(Permission.objects.create(
+                content_type=content_type,
+                codename='test_%s' % i,
+                name='Test %s' % i,
+            ))
+
+        request = self.factory.post('/fake-path', {})
+        request._messages = default_storage(request)
+
+        with self.assertNumQueries(7):
+            response = FastDeleteView.as_view()(request, pk=content_type.pk)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(get_messages(request)), 1)
+        self.assertFalse(
+            ContentType.objects.filter(pk=content_type.pk).exists()
+        )
+        self.assertFalse(
+            Permission.objects.filter(codename__startswith='test_').exists()
+        )
+        self.assertFalse(group.permissions.exists())
+        log.refresh_from_db()
+        self.assertIsNone(log.content_type)
+
+    def test_delete_message_mixin_fast_delete_receivers(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='receivers',
+        )
+        Permission.objects.create(
+            content_type=content_type, codename='test', name='Test',
+        )
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance)
+
+        signals.post_delete.connect(receiver, sender=Permission)
+
+        try:
+            request = self.factory.post('/fake-path', {})
+            request._messages = default_storage(request)
+            FastDeleteView.as_view()(request, pk=content_type.pk)
+        finally:
+            signals.post_delete.disconnect(receiver, sender=Permission)
+
+        self.assertEqual(len(deleted), 1)
+
+    def test_delete_message_mixin_background_delete(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='background',
+        )
+        group = Group.objects.create(name='Background')
+
+        for i in range(5):
+            group.permissions.add(Permission.objects.create(
+                content_type=content_type,
+                codename='test_%s' % i,
+                name='Test %s' % i,
+            ))
+
+        request = self.factory.post('/fake-path', {})
+        request._messages = default_storage(request)
+        response = BackgroundDeleteView.as_view()(request, pk=content_type.pk)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            ContentType.objects.filter(pk=content_type.pk).exists()
+        )
+
+        task = DeletionTask.for_object(content_type).get()
+        self.assertEqual(task.status, DeletionTask.STATUS_PENDING)
+        self.assertEqual(DeletionTask.schedule(content_type), task)
+        self.assertEqual(task.get_progress(), 0)
+
+        out = StringIO()
+        call_command('process_deletions', batch_size=2, stdout=out)
+        self.assertIn('11 rows', out.getvalue())
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.STATUS_DONE)
+        self.assertEqual(task.total, 11)
+        self.assertEqual(task.deleted, 11)
+        self.assertEqual(task.get_progress(), 100)
+        self.assertFalse(
+            ContentType.objects.filter(pk=content_type.pk).exists()
+        )
+        self.assertFalse(group.permissions.exists())
+
+    def test_parent_create_mixin(self):
+        content_type = ContentType.objects.get(
+            app_label='contenttypes', model='contenttype',
+        )
+
+        request = self.factory.post('/fake-path', {
+            'codename': 'test_user',
+            'name': 'Test user'
+        })
+        response = ParentCreateView.as_view()(
+            request,
+            pk_parent=content_type.id,
+        )
+        self.assertEqual(response.content_type, content_type)
+
+    def test_parent_single_object_mixin(self):
+        content_type = ContentType.objects.get(
+            app_label='contenttypes', model='contenttype',
+        )
+        permission, created = Permission.objects.get_or_create(
+            content_type=content_type,
+            codename='test_user',
+            name='Test user'
+        )
+
+        request = self.factory.get('/fake-path')
+        response = ParentSingleObjectView.as_view()(
+            request,
+            pk_parent=content_type.id,
             pk=permission.id
         )
         self.assertEqual(response.context_data['object'], permission)
 
+    def test_parent_mixin_fetches_parent_once(self):
+        content_type = ContentType.objects.get(
+            app_label='contenttypes', model='contenttype',
+        )
+        permission, created = Permission.objects.get_or_create(
+            content_type=content_type,
+            codename='test_user',
+            name='Test user'
+        )
+
+        request = self.factory.get('/fake-path')
+
+        with self.assertNumQueries(2):
+            response = ParentSingleObjectView.as_view()(
+                request,
+                pk_parent=content_type.id,
+                pk=permission.id
+            )
+        self.assertEqual(
+            response.context_data['parent_object'], content_type
+        )
+
+    def test_query_instrumentation_mixin(self):
+        content_type = ContentType.objects.get(
+            app_label='contenttypes', model='contenttype',
+        )
+        permission, created = Permission.objects.get_or_create(
+            content_type=content_type,
+            codename='test_user',
+            name='Test user'
+        )
+        request = self.factory.get('/fake-path')
+
+        with self.assertLogs('boilerplate.queries', 'INFO') as logs:
+            response = InstrumentedParentView.as_view()(
+                request, pk_parent=content_type.id, pk=permission.id
+            )
+
+            # Rendered by Django, after process_template_response
+            self.assertFalse(response.is_rendered)
+            self.assertFalse(response.has_header('Server-Timing'))
+            response.render()
+
+        self.assertTrue(response.is_rendered)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].queries, 3)
+        self.assertEqual(logs.records[0].path, '/fake-path')
+        self.assertEqual(
+            dict(
+                (section, data['queries'])
+                for section, data in logs.records[0].sections.items()
+            ),
+            {'get_parent': 1, 'view': 1, 'render': 1}
+        )
+        self.assertTrue(
+            response['Server-Timing'].startswith('db;dur=')
+        )
+        self.assertIn('get_parent;dur=', response['Server-Timing'])
+        # Cacheable once rendered
+        self.assertEqual(
+            pickle.loads(pickle.dumps(response)).content, response.content
+        )
+
+        assert_query_budget(response)
+
+        with self.assertRaisesRegex(AssertionError, 'render 1 > 0'):
+            assert_query_budget(response, {'render': 0})
+
+    def test_parent_single_object_mixin_single_query(self):
+        content_type = ContentType.objects.get(
+            app_label='contenttypes', model='contenttype',
+        )
+        permission, created = Permission.objects.get_or_create(
+            content_type=content_type,
+            codename='test_user',
+            name='Test user'
+        )
+
+        request = self.factory.get('/fake-path')
+
+        with self.assertNumQueries(1):
+            response = ParentSingleQueryView.as_view()(
+                request,
+                pk_parent=content_type.id,
+                pk=permission.id
+            )
+            self.assertEqual(response.context_data['object'], permission)
+            self.assertEqual(
+                response.context_data['parent_object'], content_type
+            )
+
+        other = ContentType.objects.get(app_label='auth', model='user')
+
+        with self.assertRaises(Http404):
+            ParentSingleQueryView.as_view()(
+                request,
+                pk_parent=other.id,
+                pk=permission.id
+            )
+
+    def test_parent_mixin_chain(self):
+        content_type = ContentType.objects.get(
+            app_label='contenttypes', model='contenttype',
+        )
+        permission = Permission.objects.filter(
+            content_type=content_type
+        ).first()
+
+        request = self.factory.get('/fake-path')
+
+        with self.assertNumQueries(1):
+            response = ParentChainView.as_view()(
+                request,
+                pk_content_type=content_type.id,
+                pk_parent=permission.id
+            )
+            self.assertEqual(
+                response.context_data['parent_objects'],
+                [content_type, permission]
+            )
+        self.assertEqual(response.context_data['parent_object'], permission)
+
+        other = ContentType.objects.get(app_label='auth', model='user')
+
+        with self.assertNumQueries(1), self.assertRaises(Http404):
+            ParentChainView.as_view()(
+                request,
+                pk_content_type=other.id,
+                pk_parent=permission.id
+            )
+
+    def test_parent_mixin_only(self):
+        content_type = ContentType.objects.get(
+            app_label='contenttypes', model='contenttype',
+        )
+
+        view = ParentSingleObjectView(
+            kwargs={'pk_parent': content_type.id},
+            parent_only=('app_label', ),
+        )
+        parent = view.get_parent()
+        self.assertEqual(parent, content_type)
+        self.assertIs(view.get_parent(), parent)
+        self.assertEqual(parent.get_deferred_fields(), {'model'})
+
     def test_extra_forms_and_formsets_mixin(self):
         content_type = ContentType.objects.get(
             app_label='contenttypes', model='contenttype',
@@ -536,6 +1524,366 @@ class MixinTest(TestCase):
             pk=content_type.pk,
         )
 
+    def test_extra_forms_and_formsets_mixin_builds_once(self):
+        content_type = ContentType.objects.get(
+            app_label='contenttypes', model='contenttype',
+        )
+
+        view = ExtraFormsAndFormsetsView(
+            request=self.factory.get('/fake-path'),
+            kwargs={'pk': content_type.pk},
+            args=(),
+        )
+        view.object = view.get_object()
+        context = view.get_context_data()
+        formset = context['formset_list'][0]
+
+        with self.assertNumQueries(0):
+            context = view.get_context_data()
+            self.assertIs(context['formset_list'][0], formset)
+            self.assertEqual(view.get_extra_forms(), [])
+
+    def test_extra_forms_and_formsets_mixin_cache_choices(self):
+        content_type = ContentType.objects.get(
+            app_label='auth', model='user',
+        )
+
+        view = LogEntryFormsView(
+            request=self.factory.get('/fake-path'),
+            kwargs={'pk': self.user.pk},
+            args=(),
+        )
+        view.object = self.user
+
+        with self.assertNumQueries(2):
+            formset = view.get_formsets()[0]
+
+            for form in formset.forms:
+                str(form['content_type'])
+
+        data = {
+            'logentry_set-TOTAL_FORMS': 3,
+            'logentry_set-INITIAL_FORMS': 0,
+            'logentry_set-MIN_NUM_FORMS': 0,
+            'logentry_set-MAX_NUM_FORMS': 1000,
+        }
+
+        for i in range(3):
+            data.update({
+                'logentry_set-%s-content_type' % i: content_type.pk,
+                'logentry_set-%s-object_repr' % i: 'Test %s' % i,
+                'logentry_set-%s-action_flag' % i: 1,
+            })
+
+        view = LogEntryFormsView(
+            request=self.factory.post('/fake-path', data),
+            kwargs={'pk': self.user.pk},
+            args=(),
+        )
+        view.object = self.user
+        formset = view.get_formsets()[0]
+
+        # Only the model validation of each foreign key hits the database
+        with self.assertNumQueries(3):
+            self.assertTrue(formset.is_valid())
+
+        self.assertEqual(
+            formset.forms[0].cleaned_data['content_type'], content_type
+        )
+
+    def test_extra_forms_and_formsets_mixin_bulk_save(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='bulk',
+        )
+        first, second, third = [
+            Permission.objects.create(
+                content_type=content_type,
+                codename='test_%s' % i,
+                name='Test %s' % i,
+            ) for i in range(3)
+        ]
+
+        request = self.factory.post('/fake-path', {
+            'app_label': content_type.app_label,
+            'model': content_type.model,
+            'permission_set-TOTAL_FORMS': 4,
+            'permission_set-INITIAL_FORMS': 3,
+            'permission_set-MIN_NUM_FORMS': 0,
+            'permission_set-MAX_NUM_FORMS': 1000,
+            'permission_set-0-id': first.pk,
+            'permission_set-0-name': 'Changed',
+            'permission_set-0-codename': first.codename,
+            'permission_set-1-id': second.pk,
+            'permission_set-1-name': second.name,
+            'permission_set-1-codename': second.codename,
+            'permission_set-1-DELETE': 'on',
+            'permission_set-2-id': third.pk,
+            'permission_set-2-name': third.name,
+            'permission_set-2-codename': third.codename,
+            'permission_set-3-name': 'New',
+            'permission_set-3-codename': 'test_new',
+        })
+        response = BulkFormsetView.as_view()(request, pk=content_type.pk)
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(
+            list(content_type.permission_set.order_by(
+                'codename'
+            ).values_list('codename', 'name')),
+            [
+                ('test_0', 'Changed'),
+                ('test_2', 'Test 2'),
+                ('test_new', 'New'),
+            ]
+        )
+
+    def test_bulk_save_formset_new_objects(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='bulknew',
+        )
+        formset = TestFormSet({
+            'permission_set-TOTAL_FORMS': 2,
+            'permission_set-INITIAL_FORMS': 0,
+            'permission_set-MIN_NUM_FORMS': 0,
+            'permission_set-MAX_NUM_FORMS': 1000,
+            'permission_set-0-name': 'First',
+            'permission_set-0-codename': 'first',
+            'permission_set-1-name': 'Second',
+            'permission_set-1-codename': 'second',
+        }, instance=content_type)
+        self.assertTrue(formset.is_valid())
+
+        objs = bulk_save_formset(formset)
+        self.assertEqual(len(objs), 2)
+        self.assertTrue(all(obj.pk is not None for obj in objs))
+        self.assertEqual(
+            set(obj.pk for obj in formset.new_objects),
+            set(content_type.permission_set.values_list('pk', flat=True))
+        )
+
+    def bulk_save_new_permissions(self, can_return_pks):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='bulk%s' % can_return_pks,
+        )
+        formset = TestFormSet({
+            'permission_set-TOTAL_FORMS': 1,
+            'permission_set-INITIAL_FORMS': 0,
+            'permission_set-MIN_NUM_FORMS': 0,
+            'permission_set-MAX_NUM_FORMS': 1000,
+            'permission_set-0-name': 'New',
+            'permission_set-0-codename': 'new',
+        }, instance=content_type)
+        self.assertTrue(formset.is_valid())
+
+        saved = list()
+
+        def receiver(sender, instance, **kwargs):
+            saved.append(instance.codename)
+
+        signals.post_save.connect(receiver, sender=Permission)
+        try:
+            with mock.patch(
+                'boilerplate.utils.can_return_bulk_pks',
+                return_value=can_return_pks,
+            ), mock.patch.object(
+                Permission._default_manager, 'bulk_create',
+                wraps=Permission._default_manager.bulk_create,
+            ) as bulk_create:
+                bulk_save_formset(formset)
+        finally:
+            signals.post_save.disconnect(receiver, sender=Permission)
+
+        self.assertEqual(
+            list(content_type.permission_set.values_list(
+                'codename', flat=True
+            )),
+            ['new']
+        )
+
+        return bulk_create.call_count, saved
+
+    def test_bulk_save_formset_returned_pks(self):
+        # PostgreSQL: one bulk_create, no save() nor signals
+        self.assertEqual(self.bulk_save_new_permissions(True), (1, []))
+
+    def test_bulk_save_formset_without_returned_pks(self):
+        # SQLite and MySQL: save() and signals for each new row
+        self.assertEqual(
+            self.bulk_save_new_permissions(False), (0, ['new'])
+        )
+
+    def test_extra_forms_and_formsets_mixin_skip_unchanged(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='skip',
+        )
+        permissions = [
+            Permission.objects.create(
+                content_type=content_type,
+                codename='test_%s' % i,
+                name='Test %s' % i,
+            ) for i in range(3)
+        ]
+        data = {
+            'permission_set-TOTAL_FORMS': 3,
+            'permission_set-INITIAL_FORMS': 3,
+            'permission_set-MIN_NUM_FORMS': 0,
+            'permission_set-MAX_NUM_FORMS': 1000,
+        }
+
+        for i, permission in enumerate(permissions):
+            data.update({
+                'permission_set-%s-id' % i: permission.pk,
+                'permission_set-%s-name' % i: permission.name,
+                'permission_set-%s-codename' % i: permission.codename,
+            })
+
+        view = BulkFormsetView(
+            request=self.factory.post('/fake-path', data),
+            kwargs={'pk': content_type.pk},
+            args=(),
+            formset_skip_unchanged=True,
+        )
+        view.object = content_type
+        formset = view.get_formsets()[0]
+
+        with self.assertNumQueries(0):
+            self.assertTrue(view.is_form_valid(formset))
+            self.assertTrue(view.is_form_valid(formset))
+
+        self.assertEqual(formset.save(), [])
+
+    def test_extra_forms_and_formsets_mixin_skip_unchanged_unique(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='skipunique',
+        )
+        first, second = [
+            Permission.objects.create(
+                content_type=content_type,
+                codename='test_%s' % i,
+                name='Test %s' % i,
+            ) for i in range(2)
+        ]
+        formset = NoUniqueQueryFormSet({
+            'permission_set-TOTAL_FORMS': 2,
+            'permission_set-INITIAL_FORMS': 2,
+            'permission_set-MIN_NUM_FORMS': 0,
+            'permission_set-MAX_NUM_FORMS': 1000,
+            'permission_set-0-id': first.pk,
+            'permission_set-0-name': first.name,
+            'permission_set-0-codename': first.codename,
+            'permission_set-1-id': second.pk,
+            'permission_set-1-name': second.name,
+            'permission_set-1-codename': first.codename,
+        }, instance=content_type)
+        BulkFormsetView().skip_unchanged_forms(formset)
+
+        # The changed row is checked against the unchanged one
+        self.assertFalse(formset.is_valid())
+        self.assertTrue(formset.non_form_errors())
+        self.assertTrue(formset.forms[1].non_field_errors())
+
+    def test_extra_forms_and_formsets_mixin_paginate(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='paginate',
+        )
+        permissions = [
+            Permission.objects.create(
+                content_type=content_type,
+                codename='test_%s' % i,
+                name='Test %s' % i,
+            ) for i in range(5)
+        ]
+
+        request = self.factory.get('/fake-path')
+        response = PaginatedFormsetView.as_view()(request, pk=content_type.pk)
+        formset = response.context_data['formset_list'][0]
+        self.assertEqual(formset.page.number, 1)
+        self.assertEqual(formset.paginator.num_pages, 3)
+        self.assertEqual(
+            [form.instance for form in formset.forms], permissions[:2]
+        )
+
+        request = self.factory.get('/fake-path', {
+            '_partial': 'permission_set',
+            'permission_set-page': 2,
+        })
+        response = PaginatedFormsetView.as_view()(request, pk=content_type.pk)
+        content = response.content.decode()
+        self.assertIn('permission_set-2-name', content)
+        self.assertIn('permission_set-3-name', content)
+        self.assertNotIn('permission_set-0-name', content)
+        self.assertNotIn('permission_set-4-name', content)
+
+        request = self.factory.post('/fake-path', {
+            'app_label': content_type.app_label,
+            'model': content_type.model,
+            'permission_set-TOTAL_FORMS': 1,
+            'permission_set-INITIAL_FORMS': 1,
+            'permission_set-MIN_NUM_FORMS': 0,
+            'permission_set-MAX_NUM_FORMS': 1000,
+            'permission_set-0-id': permissions[3].pk,
+            'permission_set-0-name': 'Changed',
+            'permission_set-0-codename': permissions[3].codename,
+        })
+        response = PaginatedFormsetView.as_view()(request, pk=content_type.pk)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(content_type.permission_set.order_by(
+                'pk'
+            ).values_list('name', flat=True)),
+            ['Test 0', 'Test 1', 'Test 2', 'Changed', 'Test 4']
+        )
+
+    def test_extra_forms_and_formsets_mixin_partial(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='partial',
+        )
+
+        request = self.factory.get('/fake-path', {
+            '_partial': 'permission_set',
+            '_row': 7,
+        })
+        response = ExtraFormsAndFormsetsView.as_view()(
+            request, pk=content_type.pk
+        )
+        content = response.content.decode()
+        self.assertIn('permission_set-7-codename', content)
+        self.assertNotIn('__prefix__', content)
+
+        request = self.factory.post('/fake-path?_partial=permission_set', {
+            'permission_set-TOTAL_FORMS': 1,
+            'permission_set-INITIAL_FORMS': 0,
+            'permission_set-MIN_NUM_FORMS': 0,
+            'permission_set-MAX_NUM_FORMS': 1000,
+            'permission_set-0-codename': 'test_partial',
+        })
+        response = ExtraFormsAndFormsetsView.as_view()(
+            request, pk=content_type.pk
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('errorlist', response.content.decode())
+        self.assertFalse(content_type.permission_set.exists())
+
+        request = self.factory.get('/fake-path', {'_partial': 'unknown'})
+
+        with self.assertRaises(Http404):
+            ExtraFormsAndFormsetsView.as_view()(request, pk=content_type.pk)
+
+    def test_extra_forms_and_formsets_mixin_select_related(self):
+        permission = Permission.objects.first()
+
+        view = ExtraFormsSelectRelatedView(
+            request=self.factory.get('/fake-path'),
+            kwargs={'pk': permission.pk},
+            args=(),
+        )
+
+        with self.assertNumQueries(1):
+            view.object = view.get_object()
+            relation_field, extra_form = view.get_extra_forms()[0]
+
+        self.assertEqual(extra_form.instance, permission.content_type)
+
     def test_extra_forms_and_formsets_and_update_message_mixin(self):
         content_type = ContentType.objects.get(
             app_label='contenttypes', model='contenttype',
@@ -571,6 +1919,71 @@ class MixinTest(TestCase):
         )
 
 
+class RelationGraphTest(TestCase):
+    def test_relation_graph(self):
+        graph = get_relation_graph()
+        self.assertIn(Group.permissions.through, graph)
+
+        node = get_relation_node(ContentType)
+        self.assertIs(node, graph[ContentType])
+        self.assertIn(Permission._meta.get_field('content_type'), node.cascade)
+        self.assertIn(LogEntry._meta.get_field('content_type'), node.set_null)
+        self.assertEqual(node.protect, [])
+        self.assertEqual(node.parents, [])
+        self.assertFalse(node.generic)
+
+    def test_relation_node_receivers(self):
+        node = get_relation_node(Permission)
+        self.assertFalse(node.has_receivers)
+
+        def receiver(sender, **kwargs):
+            pass
+
+        signals.pre_delete.connect(receiver, sender=Permission)
+
+        try:
+            self.assertTrue(node.has_receivers)
+        finally:
+            signals.pre_delete.disconnect(receiver, sender=Permission)
+
+
+@override_settings(ROOT_URLCONF='boilerplate.tests')
+class AbsoluteURLCacheTest(TestCase):
+    def setUp(self):
+        URLObject.calls = 0
+
+    def test_get_url(self):
+        urls = AbsoluteURLCache()
+        self.assertEqual(
+            [urls.get_url(URLObject(pk)) for pk in (1, 22, 333)],
+            ['/objects/1/', '/objects/22/', '/objects/333/']
+        )
+        self.assertEqual(URLObject.calls, 1)
+
+    @skipIf(path is None, 'path() requires Django 2.0')
+    def test_get_url_path_converter(self):
+        urls = AbsoluteURLCache()
+        self.assertEqual(
+            [urls.get_url(PathURLObject(pk)) for pk in (1, 22, 333, 4444)],
+            [
+                '/path-objects/1/', '/path-objects/22/',
+                '/path-objects/333/', '/path-objects/4444/'
+            ]
+        )
+        self.assertEqual(URLObject.calls, 1)
+
+    def test_get_url_other_arguments(self):
+        urls = AbsoluteURLCache()
+        self.assertEqual(
+            [urls.get_url(URLObject(pk, 7)) for pk in (1, 2)],
+            ['/objects/7/children/1/', '/objects/7/children/2/']
+        )
+        self.assertEqual(URLObject.calls, 2)
+
+    def test_get_url_without_url(self):
+        self.assertIsNone(AbsoluteURLCache().get_url(NoURLObject()))
+
+
 class MailTest(TestCase):
     def test_send_email_error(self):
         email = SendEmail(
@@ -587,3 +2000,354 @@ class MailTest(TestCase):
             content="This is the email content."
         )
         self.assertEqual(email.send(), 1)
+
+
+class StageProfilerTest(TestCase):
+    def setUp(self):
+        self.enabled = profiler.enabled
+        self.publish_interval = profiler.publish_interval
+        profiler.enabled = True
+        profiler.publish_interval = None
+        profiler.reset()
+        cache.clear()
+
+    def tearDown(self):
+        profiler.enabled = self.enabled
+        profiler.publish_interval = self.publish_interval
+        profiler.reset()
+
+    def send_email(self):
+        return SendEmail(
+            to='test@test.com',
+            subject='This is the subject',
+            content='This is the email content.'
+        ).send()
+
+    def test_profiled_stage(self):
+        for i in range(3):
+            self.send_email()
+
+        stats = profiler.get_stats()
+        self.assertEqual(list(stats), ['SendEmail.send'])
+        self.assertEqual(stats['SendEmail.send']['count'], 3)
+        self.assertLessEqual(
+            stats['SendEmail.send']['p50'], stats['SendEmail.send']['p95']
+        )
+
+    def test_profiler_disabled(self):
+        profiler.enabled = False
+        self.send_email()
+        self.assertEqual(profiler.get_stats(), {})
+
+    def test_middleware(self):
+        content_type = ContentType.objects.create(
+            app_label='boilerplate', model='profile'
+        )
+        middleware = StageProfileMiddleware(
+            lambda request: DeletePreviewView.as_view()(
+                request, pk=content_type.pk
+            )
+        )
+        response = middleware(RequestFactory().get('/fake-path'))
+
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^DeleteMessageMixin.get_context_data;dur=[0-9.]+;'
+            r'desc="1 calls"$'
+        )
+
+    def test_profile_stages_command(self):
+        self.send_email()
+        profiler.publish()
+
+        out = StringIO()
+        call_command('profile_stages', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('Stage'))
+        self.assertTrue(lines[1].startswith('SendEmail.send'))
+
+        call_command('profile_stages', reset=True, stdout=StringIO())
+        out = StringIO()
+        call_command('profile_stages', stdout=out)
+        self.assertIn('No samples', out.getvalue())
+
+
+class CProfileView(CProfileMixin, TemplateView):
+    def get_template_names(self):
+        return engines['django'].from_string('{{ view }}')
+
+    def post(self, request, *args, **kwargs):
+        return self.get(request, *args, **kwargs)
+
+
+urlpatterns.append(
+    url(r'^profiled/$', CProfileView.as_view(), name='profiled')
+)
+
+
+class CProfileTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.profile_dir = profiling.PROFILE_DIR
+        profiling.PROFILE_DIR = self.directory
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        profiling.PROFILE_DIR = self.profile_dir
+        shutil.rmtree(self.directory)
+
+    def get(self, token=None):
+        if token is None:
+            return self.factory.get('/fake-path')
+
+        return self.factory.get(
+            '/fake-path', HTTP_X_BOILERPLATE_PROFILE=token
+        )
+
+    def test_cprofile_mixin(self):
+        response = CProfileView.as_view()(self.get())
+        self.assertFalse(hasattr(response, 'profile_path'))
+
+        response = CProfileView.as_view()(self.get('invalid'))
+        self.assertFalse(hasattr(response, 'profile_path'))
+
+        response = CProfileView.as_view()(
+            self.get(profiling.get_profile_token())
+        )
+        self.assertFalse(response.is_rendered)
+        self.assertFalse(hasattr(response, 'profile_path'))
+        response.render()
+        self.assertEqual(profiling.get_dumps(), [response.profile_path])
+        self.assertEqual(
+            profiling.parse_dump_filename(response.profile_path)[1:],
+            ('-', 'CProfileView')
+        )
+
+    def test_cprofile_middleware(self):
+        view = CProfileView.as_view()
+        request = self.get(profiling.get_profile_token())
+        middleware = CProfileMiddleware(view)
+
+        response = middleware(request)
+        self.assertTrue(os.path.exists(response.profile_path))
+
+        # A request is only profiled once
+        response = middleware(request)
+        self.assertFalse(hasattr(response, 'profile_path'))
+
+    @override_settings(
+        ROOT_URLCONF='boilerplate.tests',
+        MIDDLEWARE=(
+            'boilerplate.middleware.CProfileMiddleware',
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.middleware.csrf.CsrfViewMiddleware',
+        )
+    )
+    def test_cprofile_middleware_csrf(self):
+        sample_rate = profiling.PROFILE_SAMPLE_RATE
+        profiling.PROFILE_SAMPLE_RATE = 1
+        client = Client(enforce_csrf_checks=True)
+
+        try:
+            response = client.post('/profiled/')
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(len(profiling.get_dumps()), 1)
+
+            response = client.get('/profiled/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                profiling.parse_dump_filename(response.profile_path)[1:],
+                ('profiled', 'CProfileView')
+            )
+        finally:
+            profiling.PROFILE_SAMPLE_RATE = sample_rate
+
+    def test_dump_retention(self):
+        for i in range(3):
+            CProfileView.as_view()(
+                self.get(profiling.get_profile_token())
+            ).render()
+
+        dumps = profiling.get_dumps()
+        self.assertEqual(len(dumps), 3)
+
+        path = profiling.save_profile(
+            cProfile.Profile(), 'store:actor_list', 'ActorList',
+            max_dumps=2
+        )
+        self.assertEqual(profiling.get_dumps(), [dumps[2], path])
+
+    def test_profile_requests_command(self):
+        CProfileView.as_view()(
+            self.get(profiling.get_profile_token())
+        ).render()
+
+        out = StringIO()
+        call_command('profile_requests', list=True, stdout=out)
+        self.assertIn('CProfileView', out.getvalue())
+
+        out = StringIO()
+        call_command(
+            'profile_requests', view='CProfileView', limit=5, stdout=out
+        )
+        self.assertTrue(out.getvalue().startswith('1 requests'))
+        self.assertIn('function calls', out.getvalue())
+
+        out = StringIO()
+        call_command('profile_requests', view='ActorList', stdout=out)
+        self.assertIn('No dumps.', out.getvalue())
+
+        out = StringIO()
+        call_command('profile_requests', token=True, stdout=out)
+        self.assertTrue(
+            profiling.is_valid_profile_token(out.getvalue().strip())
+        )
+
+
+class ConditionalListView(ConditionalGetMixin, ListView):
+    cache_control = {'private': True, 'max_age': 0}
+    model = DeletionTask
+    stale_while_revalidate = 30
+
+    def get_template_names(self):
+        return engines['django'].from_string(
+            '{% for object in object_list %}{{ object }}{% endfor %}'
+        )
+
+
+class ConditionalDetailView(ConditionalGetMixin, DetailView):
+    model = DeletionTask
+
+    def get_template_names(self):
+        return engines['django'].from_string('{{ object }}')
+
+
+class ConditionalParentView(ConditionalGetMixin, ParentSingleQueryView):
+    version_field = 'codename'
+
+    def get_template_names(self):
+        return engines['django'].from_string(
+            '{{ object.content_type.model }}'
+        )
+
+
+class ConditionalPermissionView(ConditionalListView):
+    model = Permission
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.content_type = ContentType.objects.get_for_model(Permission)
+        self.task = self.create_task()
+
+    def create_task(self):
+        return DeletionTask.objects.create(
+            content_type=self.content_type, object_id='1', object_repr='Test'
+        )
+
+    def test_conditional_list(self):
+        response = ConditionalListView.as_view()(self.factory.get('/'))
+        self.assertEqual(response.status_code, 200)
+        # Deleting a row wouldn't change it
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('stale-while-revalidate=30', response['Cache-Control'])
+        etag = response['ETag']
+
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+
+        with self.assertNumQueries(1):
+            response = ConditionalListView.as_view()(request)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('max-age=0', response['Cache-Control'])
+
+        self.create_task()
+        response = ConditionalListView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_conditional_detail(self):
+        response = ConditionalDetailView.as_view()(
+            self.factory.get('/'), pk=self.task.pk
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+
+        with self.assertNumQueries(1):
+            response = ConditionalDetailView.as_view()(
+                request, pk=self.task.pk
+            )
+
+        self.assertEqual(response.status_code, 304)
+
+        self.task.status = DeletionTask.STATUS_DONE
+        self.task.save()
+        response = ConditionalDetailView.as_view()(request, pk=self.task.pk)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertRaises(Http404):
+            ConditionalDetailView.as_view()(request, pk=0)
+
+    def test_conditional_detail_select_related(self):
+        permission = Permission.objects.first()
+        kwargs = {
+            'pk': permission.pk,
+            'pk_parent': permission.content_type.pk,
+        }
+        response = ConditionalParentView.as_view()(
+            self.factory.get('/'), **kwargs
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.render().content.decode(), permission.content_type.model
+        )
+
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        with self.assertNumQueries(1):
+            response = ConditionalParentView.as_view()(request, **kwargs)
+
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(USE_TZ=False, TIME_ZONE='America/Lima')
+    def test_conditional_last_modified_timestamp(self):
+        view = ConditionalListView()
+        # 2020-01-02 00:00 in Lima is 05:00 UTC
+        timestamp = 1577941200
+
+        self.assertIsNone(view.get_last_modified_timestamp(None))
+        self.assertEqual(
+            view.get_last_modified_timestamp(datetime.date(2020, 1, 2)),
+            timestamp
+        )
+        self.assertEqual(
+            view.get_last_modified_timestamp(
+                datetime.datetime(2020, 1, 2)
+            ),
+            timestamp
+        )
+        self.assertEqual(
+            view.get_last_modified_timestamp(
+                datetime.datetime(2020, 1, 2, 5, tzinfo=timezone.utc)
+            ),
+            timestamp
+        )
+
+        response = HttpResponse()
+        view.set_conditional_headers(
+            response, 'etag', datetime.date(2020, 1, 2)
+        )
+        self.assertEqual(
+            response['Last-Modified'], 'Thu, 02 Jan 2020 05:00:00 GMT'
+        )
+
+    def test_conditional_without_fields(self):
+        response = ConditionalPermissionView.as_view()(self.factory.get('/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('stale-while-revalidate=30', response['Cache-Control'])
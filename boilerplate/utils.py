@@ -1,9 +1,46 @@
+import csv
+from collections import Counter, OrderedDict
+from functools import partial, reduce
+from operator import or_
+
+try:
+    from urllib.parse import quote, urlsplit
+except ImportError:
+    from urllib import quote
+    from urlparse import urlsplit
+
+from django.apps import apps
 from django.contrib.admin.utils import NestedObjects
-from django.db import router
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import (
+    EmptyResultSet, FieldDoesNotExist, ValidationError
+)
+from django.db import connections, router, transaction
+from django.db.models import (
+    CASCADE, DO_NOTHING, PROTECT, SET_DEFAULT, SET_NULL, ProtectedError, Q,
+    signals
+)
+from django.db.models.fields.related import ForeignObjectRel
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.forms.models import ModelChoiceField, ModelMultipleChoiceField
+try:
+    from django.urls import (
+        NoReverseMatch, Resolver404, get_script_prefix, resolve, reverse
+    )
+except ImportError:
+    from django.core.urlresolvers import (
+        NoReverseMatch, Resolver404, get_script_prefix, resolve, reverse
+    )
 from django.utils.html import format_html
 from django.utils.text import capfirst
+from django.utils.translation import ugettext as _
+
+import six
 
+from .instrumentation import instrumented
 
+
+@instrumented
 def get_deleted_objects(objs, request):
     try:
         obj = objs[0]
@@ -14,19 +51,12 @@ def get_deleted_objects(objs, request):
     collector = NestedObjects(using=using)
     collector.collect(objs)
     perms_needed = set()
+    urls = AbsoluteURLCache()
 
     def format_callback(obj):
-        opts = obj._meta
-        no_edit_link = '%s: %s' % (capfirst(opts.verbose_name), obj)
-        perms_needed.add(opts.verbose_name)
+        perms_needed.add(obj._meta.verbose_name)
 
-        try:
-            return format_html('{}: <a href="{}">{}</a>',
-                               capfirst(opts.verbose_name),
-                               obj.get_absolute_url(),
-                               obj)
-        except AttributeError:
-            return no_edit_link
+        return format_deleted_object(obj, urls)
 
     to_delete = collector.nested(format_callback)
 
@@ -35,3 +65,1131 @@ def get_deleted_objects(objs, request):
         objs) for model, objs in collector.model_objs.items()}
 
     return to_delete, model_count, perms_needed, protected
+
+
+class AbsoluteURLCache(object):
+    """
+    Build the absolute URL of many objects with a single ``reverse()`` per
+    model.
+
+    The URL of the first object of each model is resolved, when the primary
+    key is its only argument the URL of the other objects is built by
+    replacing it, otherwise ``get_absolute_url()`` is called for each one.
+    Models without ``get_absolute_url`` are detected without calling it.
+    """
+    sentinel = '7390451862'
+
+    def __init__(self):
+        self.templates = dict()
+
+    def quote_pk(self, obj):
+        return quote(str(obj.pk), safe="!$&'()*+,;=/~:@")
+
+    def get_template(self, obj):
+        """
+        Return the URL of ``obj`` with a placeholder instead of its primary
+        key and the URL of ``obj``. The template is ``None`` when the model
+        has no URL and ``False`` when the URL can't be built from the
+        primary key alone.
+        """
+        if not callable(getattr(obj.__class__, 'get_absolute_url', None)):
+            return None, None
+
+        try:
+            url = str(obj.get_absolute_url())
+        except AttributeError:
+            return False, None
+
+        path = urlsplit(url).path
+        prefix = get_script_prefix()
+
+        if path.startswith(prefix):
+            path = '/' + path[len(prefix):]
+
+        pk = self.quote_pk(obj)
+
+        try:
+            match = resolve(path)
+            # path() converters like <int:pk> resolve to other types than str
+            args = [str(value) for value in match.args]
+            kwargs = [str(value) for value in match.kwargs.values()]
+
+            if args == [pk] and not kwargs:
+                template = reverse(match.view_name, args=[self.sentinel])
+            elif kwargs == [pk] and not args:
+                template = reverse(match.view_name, kwargs={
+                    key: self.sentinel for key in match.kwargs
+                })
+            else:
+                return False, url
+        except (NoReverseMatch, Resolver404):
+            return False, url
+
+        if template.replace(self.sentinel, pk) != url:
+            return False, url
+
+        return template, url
+
+    def get_url(self, obj):
+        """
+        Return the absolute URL of an object or ``None`` if it has none.
+        """
+        model = obj.__class__
+
+        if model not in self.templates:
+            self.templates[model], url = self.get_template(obj)
+
+            if self.templates[model] is not None:
+                return url
+
+        template = self.templates[model]
+
+        if template is None:
+            return None
+
+        if template is False:
+            try:
+                return obj.get_absolute_url()
+            except AttributeError:
+                return None
+
+        return template.replace(self.sentinel, self.quote_pk(obj))
+
+
+def format_deleted_object(obj, urls=None):
+    """
+    Return the name of an object to delete, with a link if it has one.
+
+    Pass the same :class:`AbsoluteURLCache` to format many objects.
+    """
+    opts = obj._meta
+
+    if urls is None:
+        urls = AbsoluteURLCache()
+
+    url = urls.get_url(obj)
+
+    if url is None:
+        return '%s: %s' % (capfirst(opts.verbose_name), obj)
+
+    return format_html('{}: <a href="{}">{}</a>',
+                       capfirst(opts.verbose_name),
+                       url,
+                       obj)
+
+
+class RelationNode(object):
+    """
+    The relations of a model that take part in the deletion of its rows:
+    the foreign keys that point to it grouped by their ``on_delete``, its
+    multi-table inheritance parents and whether it has generic relations.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.cascade = list()
+        self.protect = list()
+        self.set_null = list()
+        self.set_default = list()
+        # Foreign keys with any other ``on_delete`` but DO_NOTHING
+        self.other = list()
+        self.parents = [
+            (parent, ptr)
+            for parent, ptr in model._meta.parents.items()
+            if ptr is not None
+        ]
+        self.generic = any(
+            hasattr(field, 'bulk_related_objects')
+            for field in model._meta.private_fields
+        )
+
+        for related in get_candidate_relations_to_delete(model._meta):
+            field = related.field
+            on_delete = field.remote_field.on_delete
+
+            if on_delete is CASCADE:
+                self.cascade.append(field)
+            elif on_delete is PROTECT:
+                self.protect.append(field)
+            elif on_delete is SET_NULL:
+                self.set_null.append(field)
+            elif on_delete is SET_DEFAULT:
+                self.set_default.append(field)
+            elif on_delete is not DO_NOTHING:
+                self.other.append(field)
+
+    def __repr__(self):
+        return '<RelationNode: %s>' % self.model._meta.label
+
+    @property
+    def has_receivers(self):
+        """
+        Whether the deletion of a row sends signals with receivers, it is
+        checked on each access since receivers can connect at any time.
+        """
+        return (
+            signals.pre_delete.has_listeners(self.model) or
+            signals.post_delete.has_listeners(self.model) or
+            signals.m2m_changed.has_listeners(self.model)
+        )
+
+
+_relation_graph = dict()
+
+
+def build_relation_graph():
+    """
+    Build the :class:`RelationNode` of every installed model, it is called
+    once when the app is ready.
+    """
+    _relation_graph.clear()
+
+    for model in apps.get_models(include_auto_created=True):
+        _relation_graph[model] = RelationNode(model)
+
+    return _relation_graph
+
+
+def get_relation_graph():
+    """
+    Return the relation graph, a dict of model to :class:`RelationNode`.
+    """
+    if not _relation_graph:
+        build_relation_graph()
+
+    return _relation_graph
+
+
+def get_relation_node(model):
+    """
+    Return the :class:`RelationNode` of a model.
+    """
+    model = model._meta.concrete_model
+    graph = get_relation_graph()
+
+    if model not in graph:
+        graph[model] = RelationNode(model)
+
+    return graph[model]
+
+
+class QuerySetCollector(object):
+    """
+    Collect the cascade of deleting some objects as querysets, following
+    the relations of the models without loading any row.
+
+    Each queryset filters the rows of a model through the queryset of the
+    model it comes from, so the whole cascade can be counted or deleted
+    with set-based queries.
+
+    **Example**
+    ::
+        collector = QuerySetCollector(using='default')
+        collector.collect([movie])
+
+        if collector.can_fast_delete():
+            collector.delete()
+    """
+
+    def __init__(self, using):
+        self.using = using
+        # Model => querysets of the rows to delete
+        self.data = OrderedDict()
+        # Model => querysets of the rows that protect the deletion
+        self.protected = OrderedDict()
+        # (field, value, queryset) of the rows to update
+        self.field_updates = list()
+        # Model => models that have to be deleted before it
+        self.dependencies = dict()
+        # Models that have to be deleted through the Django collector
+        self.slow_models = set()
+        self.cycles = False
+        self.root = None
+
+    def collect(self, objs):
+        model = objs[0]._meta.concrete_model
+        self.root = model
+
+        self.add(
+            model,
+            model._base_manager.using(self.using).filter(
+                pk__in=[obj.pk for obj in objs]
+            ),
+            ()
+        )
+
+    def add(self, model, qs, path):
+        self.data.setdefault(model, list()).append(qs)
+        self.dependencies.setdefault(model, set())
+        path = path + (model, )
+        node = get_relation_node(model)
+
+        if node.generic or node.other:
+            self.slow_models.add(model)
+
+        for parent, ptr in node.parents:
+            self.slow_models.add(model)
+            self.dependencies.setdefault(parent, set()).add(model)
+            qs_parent = parent._base_manager.using(self.using).filter(
+                pk__in=qs.values(ptr.attname)
+            )
+
+            if parent in path:
+                self.data.setdefault(parent, list()).append(qs_parent)
+                self.cycles = True
+            else:
+                self.add(parent, qs_parent, path)
+
+        for field in node.cascade:
+            related_model = field.model
+            qs_related = self.get_related_queryset(field, qs)
+            self.dependencies[model].add(related_model)
+
+            if related_model in path:
+                self.data.setdefault(related_model, list()).append(qs_related)
+                self.cycles = True
+            else:
+                self.add(related_model, qs_related, path)
+
+        for field in node.protect:
+            self.protected.setdefault(field.model, list()).append(
+                self.get_related_queryset(field, qs)
+            )
+
+        for field in node.set_null:
+            self.field_updates.append(
+                (field, None, self.get_related_queryset(field, qs))
+            )
+
+        for field in node.set_default:
+            self.field_updates.append((
+                field, field.get_default(),
+                self.get_related_queryset(field, qs)
+            ))
+
+    def get_related_queryset(self, field, qs):
+        """
+        Return the rows that refer through ``field`` to the rows of ``qs``.
+        """
+        return field.model._base_manager.using(self.using).filter(**{
+            '%s__in' % field.name: qs
+        })
+
+    def get_queryset(self, model, querysets):
+        """
+        Return a single queryset with the rows of all the ``querysets``.
+        """
+        if len(querysets) == 1:
+            return querysets[0]
+
+        return model._base_manager.using(self.using).filter(
+            reduce(or_, [Q(pk__in=qs.values('pk')) for qs in querysets])
+        )
+
+    def can_raw_delete(self, model):
+        """
+        Return ``True`` if the rows of ``model`` can be deleted with a plain
+        ``DELETE`` once the models that refer to it are deleted.
+        """
+        return (
+            model not in self.slow_models and
+            not get_relation_node(model).has_receivers
+        )
+
+    def has_protected(self):
+        return any(
+            self.get_queryset(model, querysets).exists()
+            for model, querysets in self.protected.items()
+        )
+
+    def can_fast_delete(self):
+        """
+        Return ``True`` if the cascade can be deleted with set-based queries:
+        it has no cycles, no signal receivers, no protected rows and no
+        multi-table inheritance or generic relations.
+        """
+        if self.cycles:
+            return False
+
+        if not all(self.can_raw_delete(model) for model in self.data):
+            return False
+
+        return not self.has_protected()
+
+    def count(self):
+        """
+        Return the number of rows to delete, with a ``COUNT`` per model.
+        """
+        return sum(
+            self.get_queryset(model, querysets).count()
+            for model, querysets in self.data.items()
+        )
+
+    def sample(self, limit):
+        """
+        Return at most ``limit`` of the rows to delete besides the collected
+        objects, loading only those rows.
+        """
+        output = list()
+
+        for model, querysets in self.data.items():
+            remaining = limit - len(output)
+
+            if remaining <= 0:
+                break
+
+            if model is self.root and len(querysets) == 1:
+                continue
+
+            output.extend(self.get_queryset(model, querysets)[:remaining])
+
+        return output
+
+    def delete_batches(self, batch_size=1000):
+        """
+        Delete the collected rows in batches of at most ``batch_size`` rows
+        per query, each one in its own transaction, and yield the number of
+        rows deleted by each batch. The models are deleted one after the
+        other following :meth:`sort`, through ``QuerySet.delete()`` when
+        :meth:`can_raw_delete` doesn't allow a plain ``DELETE``.
+        """
+        if self.has_protected():
+            raise ProtectedError(
+                _('The objects are referenced through protected foreign '
+                  'keys.'),
+                [
+                    obj for model, querysets in self.protected.items()
+                    for obj in self.get_queryset(model, querysets)[:10]
+                ]
+            )
+
+        for field, value, qs in self.field_updates:
+            qs = qs.exclude(**{field.attname: value})
+
+            while True:
+                with transaction.atomic(using=self.using):
+                    pks = list(
+                        qs.values_list('pk', flat=True)[:batch_size]
+                    )
+
+                    if not pks:
+                        break
+
+                    qs.model._base_manager.using(self.using).filter(
+                        pk__in=pks
+                    ).update(**{field.name: value})
+
+        for model in self.sort():
+            qs = self.get_queryset(model, self.data[model])
+            raw = self.can_raw_delete(model)
+
+            while True:
+                with transaction.atomic(using=self.using):
+                    pks = list(
+                        qs.values_list('pk', flat=True)[:batch_size]
+                    )
+
+                    if not pks:
+                        break
+
+                    batch = model._base_manager.using(self.using).filter(
+                        pk__in=pks
+                    )
+
+                    if raw:
+                        count = batch._raw_delete(self.using)
+                    else:
+                        count, counter = batch.delete()
+
+                yield count
+
+    def sort(self):
+        """
+        Return the models to delete, each one after the models that refer
+        to it.
+        """
+        output = list()
+        pending = OrderedDict(
+            (model, set(self.dependencies[model])) for model in self.data
+        )
+
+        while pending:
+            ready = [
+                model for model, dependencies in pending.items()
+                if not dependencies.intersection(pending)
+            ]
+
+            if not ready:
+                raise ValueError('The cascade has cycles.')
+
+            for model in ready:
+                output.append(model)
+                del pending[model]
+
+        return output
+
+    def delete(self):
+        """
+        Delete the collected rows with a ``DELETE`` per model, the nullable
+        references are updated first. Returns the same values as
+        ``QuerySet.delete()``.
+        """
+        deleted_counter = Counter()
+
+        with transaction.atomic(using=self.using, savepoint=False):
+            for field, value, qs in self.field_updates:
+                qs.update(**{field.name: value})
+
+            for model in self.sort():
+                qs = self.get_queryset(model, self.data[model])
+                deleted_counter[model._meta.label] += qs._raw_delete(
+                    self.using
+                )
+
+        return sum(deleted_counter.values()), dict(deleted_counter)
+
+
+@instrumented
+def fast_delete_objects(objs):
+    """
+    Delete ``objs`` and their cascade with set-based queries when
+    :meth:`QuerySetCollector.can_fast_delete` allows it, otherwise each
+    object is deleted with ``Model.delete()``.
+    """
+    try:
+        obj = objs[0]
+    except IndexError:
+        return 0, {}
+    else:
+        using = router.db_for_write(obj._meta.model)
+
+    collector = QuerySetCollector(using=using)
+    collector.collect(objs)
+
+    if collector.can_fast_delete():
+        return collector.delete()
+
+    deleted_counter = Counter()
+
+    for obj in objs:
+        count, counter = obj.delete()
+        deleted_counter.update(counter)
+
+    return sum(deleted_counter.values()), dict(deleted_counter)
+
+
+@instrumented
+def get_deleted_objects_summary(objs, request, limit=10):
+    """
+    Like :func:`get_deleted_objects` but the rows of each model are counted
+    with aggregate queries and at most ``limit`` samples per model are
+    loaded, so the cost doesn't depend on the size of the cascade.
+
+    Returns ``to_delete``, ``model_count``, ``perms_needed``, ``protected``
+    and ``truncated``, which is ``True`` when some rows are not listed.
+    """
+    try:
+        obj = objs[0]
+    except IndexError:
+        return [], {}, set(), [], False
+    else:
+        using = router.db_for_write(obj._meta.model)
+
+    collector = QuerySetCollector(using=using)
+    collector.collect(objs)
+    truncated = collector.cycles
+    root = obj._meta.concrete_model
+    perms_needed = set()
+    model_count = OrderedDict()
+    children = list()
+    protected = list()
+    urls = AbsoluteURLCache()
+
+    for model, querysets in collector.data.items():
+        opts = model._meta
+
+        if model is root and len(querysets) == 1:
+            model_count[opts.verbose_name_plural] = len(objs)
+            perms_needed.add(opts.verbose_name)
+            continue
+
+        qs = collector.get_queryset(model, querysets)
+        count = qs.count()
+
+        if not count:
+            continue
+
+        model_count[opts.verbose_name_plural] = count
+        perms_needed.add(opts.verbose_name)
+        samples = [
+            format_deleted_object(item, urls) for item in qs[:limit]
+        ]
+
+        if count > len(samples):
+            truncated = True
+            samples.append(
+                _('%(count)s more %(name)s') % {
+                    'count': count - len(samples),
+                    'name': opts.verbose_name_plural,
+                }
+            )
+
+        children.append(
+            '%s: %s' % (capfirst(opts.verbose_name_plural), count)
+        )
+        children.append(samples)
+
+    for model, querysets in collector.protected.items():
+        qs = collector.get_queryset(model, querysets)
+        count = qs.count()
+
+        if not count:
+            continue
+
+        protected.extend(
+            format_deleted_object(item, urls) for item in qs[:limit]
+        )
+
+        if count > limit:
+            truncated = True
+            protected.append(
+                _('%(count)s more %(name)s') % {
+                    'count': count - limit,
+                    'name': model._meta.verbose_name_plural,
+                }
+            )
+
+    to_delete = [format_deleted_object(item, urls) for item in objs]
+
+    if children:
+        to_delete.append(children)
+
+    return to_delete, model_count, perms_needed, protected, truncated
+
+
+def _cached_choice_to_python(field, instances):
+    def to_python(value):
+        if value in field.empty_values:
+            return None
+
+        try:
+            return instances[str(value)]
+        except KeyError:
+            raise ValidationError(
+                field.error_messages['invalid_choice'], code='invalid_choice'
+            )
+
+    return to_python
+
+
+def cache_model_choices(forms, cache=None):
+    """
+    Evaluate the queryset of each ``ModelChoiceField`` of ``forms`` only once
+    and share the choices among all of them, both to render and to validate.
+    Hidden fields, like the primary key of model formsets, are skipped.
+
+    ``cache`` can be shared between calls to reuse the choices of any field
+    with the same name and query.
+    """
+    if cache is None:
+        cache = {}
+
+    for form in forms:
+        for name, field in form.fields.items():
+            if (
+                not isinstance(field, ModelChoiceField) or
+                field.widget.is_hidden
+            ):
+                continue
+
+            try:
+                key = (field.__class__, name, str(field.queryset.query))
+            except EmptyResultSet:
+                continue
+
+            if key not in cache:
+                iterator = field.iterator(field)
+                choices = list()
+                instances = dict()
+
+                if field.empty_label is not None:
+                    choices.append(('', field.empty_label))
+
+                for obj in field.queryset:
+                    choices.append(iterator.choice(obj))
+                    instances[str(field.prepare_value(obj))] = obj
+
+                cache[key] = (choices, instances)
+
+            choices, instances = cache[key]
+            field.choices = choices
+
+            if not isinstance(field, ModelMultipleChoiceField):
+                field.to_python = _cached_choice_to_python(field, instances)
+
+    return cache
+
+
+def cache_batch_choices(forms):
+    """
+    Fetch the objects selected in the ``ModelChoiceField`` of ``forms``, bound
+    forms of the same class, with a single ``in_bulk()`` per field, so
+    validating them doesn't run a query per form nor load the whole table.
+    Hidden fields and ``ModelMultipleChoiceField`` are skipped.
+    """
+    if not forms:
+        return
+
+    for name, field in forms[0].fields.items():
+        if (
+            not isinstance(field, ModelChoiceField) or
+            isinstance(field, ModelMultipleChoiceField) or
+            field.widget.is_hidden
+        ):
+            continue
+
+        key_name = field.to_field_name or 'pk'
+        opts = field.queryset.model._meta
+        key_field = (
+            opts.pk if key_name == 'pk' else opts.get_field(key_name)
+        )
+        keys = dict()
+
+        for form in forms:
+            value = field.widget.value_from_datadict(
+                form.data, form.files, form.add_prefix(name)
+            )
+
+            if value in field.empty_values:
+                continue
+
+            try:
+                keys[str(value)] = key_field.to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                continue
+
+        objs = field.queryset.in_bulk(
+            set(keys.values()),
+            **({} if key_name == 'pk' else {'field_name': key_name})
+        ) if keys else {}
+        instances = dict(
+            (value, objs[key]) for value, key in keys.items() if key in objs
+        )
+
+        for form in forms:
+            form.fields[name].to_python = _cached_choice_to_python(
+                form.fields[name], instances
+            )
+
+
+def can_return_bulk_pks(model):
+    """
+    Return if ``bulk_create`` sets the primary key of the objects of
+    ``model`` on its database.
+    """
+    features = connections[router.db_for_write(model)].features
+
+    return getattr(
+        features, 'can_return_rows_from_bulk_insert',
+        getattr(features, 'can_return_ids_from_bulk_insert', False)
+    )
+
+
+def bulk_save_formset(formset):
+    """
+    Save a valid model formset with one ``bulk_create`` for the new rows, one
+    ``bulk_update`` for each group of changed fields and a single queryset
+    ``delete`` for the deleted rows.
+
+    ``bulk_create`` and ``bulk_update`` don't call ``Model.save()`` nor send
+    the ``pre_save`` and ``post_save`` signals, the deleted rows still send
+    ``pre_delete`` and ``post_delete``. Many to many data is not saved.
+
+    How the new rows are saved depends on the database, see
+    :func:`can_return_bulk_pks`:
+
+    * PostgreSQL returns the primary keys of ``bulk_create``, the new rows
+      are inserted in bulk without ``Model.save()`` nor ``pre_save`` and
+      ``post_save``.
+    * SQLite and MySQL don't, the new rows are saved one by one with
+      ``Model.save()`` and send ``pre_save`` and ``post_save``.
+
+    Don't rely on the signals of the new rows being sent or skipped. The
+    changed rows are saved one by one with ``Model.save()`` when
+    ``bulk_update`` is not available, before Django 2.2.
+    """
+    model = formset.model
+    opts = model._meta
+    manager = model._default_manager
+    fk = getattr(formset, 'fk', None)
+    new_objects = list()
+    changed = dict()
+    deleted_objects = list()
+
+    formset.new_objects = list()
+    formset.changed_objects = list()
+    formset.deleted_objects = list()
+
+    for form in formset.initial_forms:
+        obj = form.instance
+
+        if obj.pk is None:
+            continue
+
+        if formset.can_delete and formset._should_delete_form(form):
+            deleted_objects.append(obj)
+            continue
+
+        if not form.has_changed():
+            continue
+
+        fields = list()
+
+        for name in form.changed_data:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+
+            if field.concrete and not field.many_to_many:
+                fields.append(field.name)
+
+        obj = form.save(commit=False)
+        formset.changed_objects.append((obj, form.changed_data))
+
+        if fields:
+            changed.setdefault(tuple(sorted(fields)), list()).append(obj)
+
+    for form in formset.extra_forms:
+        if not form.has_changed():
+            continue
+
+        if formset.can_delete and formset._should_delete_form(form):
+            continue
+
+        obj = form.save(commit=False)
+
+        if fk is not None:
+            setattr(obj, fk.name, formset.instance)
+
+        new_objects.append(obj)
+
+    if new_objects and can_return_bulk_pks(model):
+        formset.new_objects = manager.bulk_create(new_objects)
+    else:
+        for obj in new_objects:
+            obj.save()
+
+        formset.new_objects = new_objects
+
+    for fields, objs in changed.items():
+        if hasattr(manager, 'bulk_update'):
+            manager.bulk_update(objs, fields)
+        else:
+            for obj in objs:
+                obj.save(update_fields=fields)
+
+    if deleted_objects:
+        manager.filter(
+            pk__in=[obj.pk for obj in deleted_objects]
+        ).delete()
+        formset.deleted_objects = deleted_objects
+
+    return formset.new_objects + [obj for obj, _ in formset.changed_objects]
+
+
+def delete_objects_in_batches(objs, batch_size=1000):
+    """
+    Delete ``objs`` and their cascade in batches of at most ``batch_size``
+    rows, see :meth:`QuerySetCollector.delete_batches`, and yield the number
+    of rows deleted by each batch. Cascades with cycles are deleted at once
+    with ``Model.delete()``.
+    """
+    try:
+        obj = objs[0]
+    except IndexError:
+        return
+    else:
+        using = router.db_for_write(obj._meta.model)
+
+    collector = QuerySetCollector(using=using)
+    collector.collect(objs)
+
+    if collector.cycles:
+        for obj in objs:
+            count, counter = obj.delete()
+            yield count
+
+        return
+
+    for count in collector.delete_batches(batch_size):
+        yield count
+
+
+class EchoBuffer(object):
+    """
+    File-like object that returns what is written to it, so a
+    :func:`csv.writer` can produce the lines of a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iterate_values(queryset, fields, chunk_size=2000):
+    """
+    Iterate the ``fields`` values of ``queryset`` fetching ``chunk_size``
+    rows at a time, without filling the queryset cache.
+    """
+    queryset = queryset.values_list(*fields)
+
+    try:
+        return queryset.iterator(chunk_size=chunk_size)
+    except TypeError:
+        return queryset.iterator()
+
+
+def _stream_chunks(header, lines, chunk_size):
+    if header is not None:
+        yield header
+
+    chunk = list()
+
+    for line in lines:
+        chunk.append(line)
+
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = list()
+
+    if chunk:
+        yield ''.join(chunk)
+
+
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def escape_csv_formula(value):
+    """
+    Prefix with ``'`` the strings that spreadsheets would read as a formula.
+    """
+    if isinstance(value, six.string_types) and value.startswith(
+        CSV_FORMULA_PREFIXES
+    ):
+        return "'" + value
+
+    return value
+
+
+def stream_csv(rows, headers=None, chunk_size=2000, escape_formulas=True):
+    """
+    Yield ``rows`` as CSV, the ``headers`` line first and then the rows
+    joined in blocks of ``chunk_size`` lines.
+
+    The values starting with ``=``, ``+``, ``-`` or ``@`` are escaped with
+    :func:`escape_csv_formula` unless ``escape_formulas`` is ``False``.
+    """
+    writer = csv.writer(EchoBuffer())
+    header = writer.writerow(headers) if headers else None
+
+    if escape_formulas:
+        rows = ([escape_csv_formula(value) for value in row] for row in rows)
+
+    return _stream_chunks(
+        header, (writer.writerow(row) for row in rows), chunk_size
+    )
+
+
+def stream_json_lines(rows, fields, chunk_size=2000):
+    """
+    Yield ``rows`` as JSON Lines, one object with the ``fields`` keys per
+    row, joined in blocks of ``chunk_size`` lines.
+    """
+    encoder = DjangoJSONEncoder()
+
+    return _stream_chunks(None, (
+        encoder.encode(OrderedDict(zip(fields, row))) + '\n' for row in rows
+    ), chunk_size)
+
+
+_recording_querysets = dict()
+
+
+def _recording_queryset_class(klass):
+    """
+    Return a subclass of the queryset class ``klass`` that calls its
+    ``_prefetch_recorder`` whenever its rows are used.
+    """
+    if klass not in _recording_querysets:
+        def recording(name):
+            def method(self, *args, **kwargs):
+                recorder = getattr(self, '_prefetch_recorder', None)
+
+                if recorder is not None:
+                    recorder()
+
+                return getattr(klass, name)(self, *args, **kwargs)
+
+            method.__name__ = name
+
+            return method
+
+        attrs = dict(
+            (name, recording(name)) for name in (
+                '__iter__', '__len__', '__bool__', '__nonzero__',
+                '__getitem__', '_clone', 'count', 'exists',
+            )
+        )
+        _recording_querysets[klass] = type(
+            str('Recording%s' % klass.__name__), (klass, ), attrs
+        )
+
+    return _recording_querysets[klass]
+
+
+def _leaf_lookups(lookups):
+    """
+    Drop the lookups that are a prefix of another lookup.
+    """
+    return tuple(sorted(
+        lookup for lookup in lookups if not any(
+            other.startswith(lookup + '__') for other in lookups
+        )
+    ))
+
+
+def _get_prefetch_relation(field):
+    """
+    Return the ``(lookup, prefetch cache name, related model, field back to
+    the instance)`` of a many valued relation, the cache names are the ones
+    of the related managers of Django.
+    """
+    if isinstance(field, ForeignObjectRel):
+        if field.many_to_many:
+            return (
+                field.get_accessor_name(), field.field.related_query_name(),
+                field.related_model, None
+            )
+
+        return (
+            field.get_accessor_name(), field.get_cache_name(),
+            field.related_model, field.field.name
+        )
+
+    return field.name, field.attname, field.related_model, None
+
+
+class PrefetchRecorder(object):
+    """
+    Learn the ``select_related()`` and ``prefetch_related()`` lookups that a
+    list of objects needs from the relations used while they are rendered.
+
+    The single valued relations are read from the related objects cached in
+    each instance. The many valued relations are all prefetched, see
+    :meth:`get_queryset`, and recorded when their rows are used, so a
+    learning render runs one more query per many valued relation of the
+    model, used or not.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.accessed = set()
+        self.relations = dict()
+
+        for field in model._meta.get_fields():
+            if field.is_relation and (field.one_to_many or field.many_to_many):
+                relation = _get_prefetch_relation(field)
+                self.relations[relation[0]] = relation[1:]
+
+        self.lookups = list(self.relations)
+
+    def get_queryset(self, queryset):
+        """
+        Prefetch every many valued relation of ``queryset``.
+        """
+        return queryset.prefetch_related(*self.lookups)
+
+    def watch(self, objs):
+        """
+        Record when the prefetched relations of ``objs`` are used, the class
+        of their prefetched querysets is replaced by a recording subclass.
+        """
+        for obj in objs:
+            cache = getattr(obj, '_prefetched_objects_cache', {})
+
+            for lookup in self.lookups:
+                queryset = cache.get(self.relations[lookup][0])
+
+                if queryset is None:
+                    continue
+
+                queryset.__class__ = _recording_queryset_class(
+                    queryset.__class__
+                )
+                queryset._prefetch_recorder = partial(
+                    self.accessed.add, lookup
+                )
+
+    def collect(self, objs, model, prefix, select, prefetch, many=False,
+                exclude=None):
+        names = set()
+
+        for obj in objs:
+            names.update(getattr(obj._state, 'fields_cache', {}))
+
+        names.discard(exclude)
+
+        for name in names:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+
+            related_model = getattr(field, 'related_model', None)
+            lookup = prefix + name
+
+            if many or related_model is None:
+                prefetch.add(lookup)
+            else:
+                select.add(lookup)
+
+            if related_model is None:
+                continue
+
+            self.collect(
+                [
+                    obj._state.fields_cache[name] for obj in objs
+                    if obj._state.fields_cache.get(name) is not None
+                ],
+                related_model, lookup + '__', select, prefetch, many
+            )
+
+    def get_plan(self, objs):
+        """
+        Return the plan learned from ``objs`` as a dictionary with the
+        ``select_related`` and ``prefetch_related`` lookups.
+        """
+        select = set()
+        prefetch = set()
+        self.collect(objs, self.model, '', select, prefetch)
+
+        for lookup in self.accessed:
+            cache_name, model, exclude = self.relations[lookup]
+            related = list()
+            prefetch.add(lookup)
+
+            for obj in objs:
+                queryset = obj._prefetched_objects_cache.get(cache_name)
+
+                if queryset is not None:
+                    related.extend(queryset._result_cache or [])
+
+            self.collect(
+                related, model, lookup + '__', select, prefetch, True,
+                exclude
+            )
+
+        return {
+            'select_related': _leaf_lookups(select),
+            'prefetch_related': _leaf_lookups(prefetch),
+        }
@@ -43,6 +43,9 @@ setup(
     url='https://github.com/cubope/django-boilerplate',
     packages=[
         'boilerplate',
+        'boilerplate.management',
+        'boilerplate.management.commands',
+        'boilerplate.migrations',
     ],
     include_package_data=True,
     install_requires=['Pillow', 'six'],